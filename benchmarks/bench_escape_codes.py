@@ -0,0 +1,52 @@
+"""Compare encodes per second of the cached escape code encoders and uncached ones.
+
+The workload mimics redraws of an edit field: the same cursor positions are
+encoded over and over. Run it from the repository root:
+
+    python -m benchmarks.bench_escape_codes
+"""
+import argparse
+import timeit
+import turm.escape_codes as escape_codes
+
+
+def _redraw_workload(move_cursor_to, move_cursor_left, erase_line, rows,
+                     columns):
+
+    def redraw():
+        for row in range(1, rows + 1):
+            move_cursor_to(row, 5)
+            erase_line()
+            move_cursor_to(row, columns)
+            move_cursor_left(row % 8 + 1)
+
+    return redraw, rows * 4
+
+
+def _uncached_erase_line():
+    return '\x1b[2K'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--columns', type=int, default=120)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    variants = {
+        'uncached':
+        (escape_codes.move_cursor_to.__wrapped__,
+         escape_codes.move_cursor_left.__wrapped__, _uncached_erase_line),
+        'cached': (escape_codes.move_cursor_to, escape_codes.move_cursor_left,
+                   escape_codes.erase_line),
+    }
+    for name, encoders in variants.items():
+        redraw, encodes = _redraw_workload(*encoders, args.rows,
+                                           args.columns)
+        seconds = min(timeit.repeat(redraw, number=args.repeat, repeat=5))
+        print(f'{name:>9}: {encodes * args.repeat / seconds:,.0f} encodes/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compare searches per second of History.search and a scan of the entries.
+
+The workload mimics ctrl-r in a long history: the matches are old entries, so
+most of the history is searched. Run it from the repository root:
+
+    python -m benchmarks.bench_history
+"""
+import argparse
+import timeit
+from turm.history import History
+
+
+def _scan(entries, query):
+    for index in range(len(entries) - 1, -1, -1):
+        if query in entries[index]:
+            return index
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    history = History()
+    for i in range(args.entries):
+        history.add(f'value_{i} = compute({i})')
+    entries = list(history)
+    queries = [f'value_{i} =' for i in range(0, args.entries, 997)]
+    history.search('x')  # the first search joins the entries
+
+    variants = {
+        'scan': lambda: [_scan(entries, query) for query in queries],
+        'search': lambda: [history.search(query) for query in queries],
+    }
+    for name, search in variants.items():
+        seconds = min(timeit.repeat(search, number=args.repeat, repeat=5))
+        print(f'{name:>6}: {len(queries) * args.repeat / seconds:,.0f} '
+              f'searches/s')
+
+
+if __name__ == '__main__':
+    main()
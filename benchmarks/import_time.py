@@ -0,0 +1,56 @@
+"""Measure how long importing a turm module takes in a fresh interpreter.
+
+Run it against two checkouts to compare them, e.g. a worktree of an older commit:
+
+    python benchmarks/import_time.py --path /path/to/other/checkout
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+_TIMER = '''
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+
+def measure(module, path, runs):
+    env = dict(os.environ)
+    # Imports normally load cached bytecode, so let the warm up run write it.
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    code = _TIMER.format(module=module)
+    times = []
+    for _ in range(runs + 1):
+        # -S skips site, whose imports vary between installs and would hide ours.
+        output = subprocess.run([sys.executable, '-S', '-c', code],
+                                env=env,
+                                cwd=path,
+                                check=True,
+                                capture_output=True,
+                                text=True).stdout
+        times.append(float(output))
+    return times[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='turm.escape_codes')
+    parser.add_argument('--path',
+                        default=os.path.dirname(os.path.dirname(
+                            os.path.abspath(__file__))),
+                        help='the checkout to import from')
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    times = measure(args.module, args.path, args.runs)
+    print(f'{args.module} from {args.path}')
+    print(f'median {statistics.median(times) * 1000:.2f} ms, '
+          f'min {min(times) * 1000:.2f} ms over {args.runs} runs')
+
+
+if __name__ == '__main__':
+    main()
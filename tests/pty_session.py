@@ -0,0 +1,64 @@
+import fcntl
+import os
+import pty
+import select
+import struct
+import sys
+import termios
+import time
+
+CURSOR_QUERY = b'\x1b[6n'
+
+
+class PtySession:
+    """Python running `code` in a child process on a pseudo terminal"""
+
+    def __init__(self, code, home):
+        self.pid, self.fd = pty.fork()
+        if self.pid == 0:
+            os.environ['HOME'] = str(home)
+            os.execv(sys.executable, [sys.executable, '-c', code])
+        fcntl.ioctl(self.fd, termios.TIOCSWINSZ,
+                    struct.pack('HHHH', 24, 80, 0, 0))
+        self.output = b''
+
+    def _read(self, timeout):
+        # Cursor queries are answered as they're read. The cursor is only asked for
+        # at the start of a prompt, which is always at the start of a row here.
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return True
+        try:
+            data = os.read(self.fd, 4096)
+        except OSError:
+            return False  # the child closed the terminal
+        for _ in range(data.count(CURSOR_QUERY)):
+            os.write(self.fd, b'\x1b[1;1R')
+        self.output += data
+        return bool(data)
+
+    def read_until(self, text, timeout=5):
+        """Read the output until `text` is in it"""
+        end = time.monotonic() + timeout
+        while text not in self.output:
+            remaining = end - time.monotonic()
+            assert remaining > 0, f'{text!r} not in {self.output!r}'
+            assert self._read(remaining), f'the output ended without {text!r}'
+
+    def write(self, text):
+        os.write(self.fd, text.encode())
+
+    def wait(self, timeout=5):
+        """Read the output until the child exits and return its exit code"""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            # Resetting the terminal waits for the output to be read.
+            self._read(0.01)
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                return os.waitstatus_to_exitcode(status)
+        os.kill(self.pid, 9)
+        os.waitpid(self.pid, 0)
+        raise AssertionError('the interpreter didn\'t exit')
+
+    def close(self):
+        os.close(self.fd)
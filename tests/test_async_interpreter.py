@@ -0,0 +1,38 @@
+import time
+from pty_session import CURSOR_QUERY, PtySession
+
+
+def test_ctrl_c_interrupts_code_run_inline(tmp_path):
+    session = PtySession('from turm.async_interpreter import main; main()',
+                         tmp_path)
+    try:
+        session.read_until(CURSOR_QUERY)
+        session.write('while True: pass\n\n')
+        time.sleep(0.2)
+        session.write('\x03')
+        session.read_until(b'KeyboardInterrupt')
+        # The interpreter carries on rather than asyncio's handler stopping it.
+        session.write('print(40 + 2)\n')
+        session.read_until(b'42')
+        session.write('exit(0)\n')
+        assert session.wait() == 0
+    finally:
+        session.close()
+
+
+def test_code_run_on_a_thread(tmp_path):
+    session = PtySession(
+        'import asyncio\n'
+        'from turm.async_interpreter import AsyncInterpreter\n'
+        'from turm.executors import ThreadExecutor\n'
+        'asyncio.run(AsyncInterpreter(executor=ThreadExecutor()).run())\n',
+        tmp_path)
+    try:
+        session.read_until(CURSOR_QUERY)
+        for number in range(3):
+            session.write(f'import time; time.sleep(0.05); print({number} * 7)\n')
+            session.read_until(f'{number * 7}\r\n'.encode())
+        session.write('exit(0)\n')
+        assert session.wait() == 0
+    finally:
+        session.close()
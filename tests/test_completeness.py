@@ -0,0 +1,70 @@
+from turm.completeness import CompletenessChecker, LineState, scan_line
+
+
+def test_scan_line():
+    assert scan_line('x = 1').end == LineState()
+    assert scan_line('x = foo(1, [2').end.brackets == '(['
+    assert scan_line('x = "(" # (').end == LineState()
+    assert scan_line('x = """abc').end.string == '"""'
+    assert scan_line('x = 1 + \\').end.continued
+    assert scan_line('if x:  # comment').opens_block
+    assert not scan_line('x = {1: 2}').opens_block
+
+    line = scan_line('abc""" + f(', LineState(string='"""'))
+    assert line.end == LineState(brackets='(')
+    assert not line.starts_statement
+
+
+def test_single_lines():
+    checker = CompletenessChecker()
+    assert checker.check('1 + 1') == 'single'
+    assert checker.check('a = 1; b = 2') == 'single'
+    assert checker.check('if x:') is None
+    assert checker.check('@decorator') is None
+    assert checker.check('x = (1,') is None
+    assert checker.check('') == 'single'
+
+
+def test_blocks_need_an_empty_line():
+    checker = CompletenessChecker()
+    assert checker.check('if x:\n    y = 1') is None
+    assert checker.check('if x:\n    y = 1\nelse:\n    y = 2') is None
+    assert checker.check('if x:\n    y = 1\nelse:\n    y = 2\n') == 'single'
+
+
+def test_brackets_and_strings_across_lines():
+    checker = CompletenessChecker()
+    assert checker.check('x = (1,\n2)') == 'single'
+    assert checker.check('x = """a\n\nb') is None
+    assert checker.check('x = """a\n\nb"""') == 'single'
+    # an empty line always has the source compiled
+    assert checker.check('x = (1,\n') == 'single'
+
+
+def test_several_statements():
+    checker = CompletenessChecker()
+    assert checker.check('a = 1\nb = 2') == 'exec'
+    assert checker.check('@f\ndef g():\n    pass\n') == 'single'
+    assert checker.check('def g():\n    pass\ng()\n') == 'exec'
+
+
+def test_only_changed_lines_are_scanned(monkeypatch):
+    import turm.completeness as completeness
+    scanned = []
+
+    def counting_scan_line(text, start=LineState()):
+        scanned.append(text)
+        return scan_line(text, start)
+
+    monkeypatch.setattr(completeness, 'scan_line', counting_scan_line)
+    checker = CompletenessChecker()
+    source = 'def f(x):'
+    checker.check(source)
+    for i in range(100):
+        source += f'\n    x += {i}'
+        checker.check(source)
+    assert len(scanned) == 101
+
+    scanned.clear()
+    checker.check(source.replace('x += 50', 'x -= 50'))
+    assert scanned == ['    x -= 50']
@@ -0,0 +1,68 @@
+import os.path
+from turm.completion import Completer, PrefixTrie
+
+
+def test_prefix_trie():
+    trie = PrefixTrie(['print', 'property', 'pow', 'x'])
+    assert len(trie) == 4
+    assert trie.with_prefix('pr') == ['print', 'property']
+    assert trie.with_prefix('') == ['pow', 'print', 'property', 'x']
+    assert trie.with_prefix('q') == []
+    trie.add('print')
+    assert len(trie) == 4
+
+    trie.discard('print')
+    trie.discard('missing')
+    trie.discard('pr')
+    assert 'print' not in trie
+    assert 'property' in trie
+    assert trie.with_prefix('pri') == []
+    assert len(trie) == 3
+
+
+def test_names_follow_namespace():
+    namespace = {}
+    completer = Completer(namespace)
+    assert completer.complete('pri') == (0, ['print'])
+    assert completer.complete('x = whi') == (4, ['while'])
+
+    namespace['printer'] = 1
+    namespace['value'] = 2
+    assert completer.complete('pri') == (0, ['print', 'printer'])
+    del namespace['printer']
+    assert completer.complete('(va') == (1, ['value', 'vars'])
+    assert completer.complete('pri') == (0, ['print'])
+
+
+def test_attributes():
+    class Point:
+        def __init__(self):
+            self.x = 1
+            self._hidden = 2
+
+        def distance(self):
+            pass
+
+    namespace = {'Point': Point, 'p': Point(), 'os': os}
+    completer = Completer(namespace)
+    assert completer.complete('p.') == (0, ['p.distance', 'p.x'])
+    assert completer.complete('p._h') == (0, ['p._hidden'])
+    assert completer.complete('Point.d') == (0, ['Point.distance'])
+    assert completer.complete('os.path.joi') == (0, ['os.path.join'])
+    assert completer.complete('missing.x') == (0, [])
+    assert completer.complete('str.isdig') == (0, ['str.isdigit'])
+
+    # instances share the attributes of their type
+    cached = len(completer._attributes)
+    namespace['q'] = Point()
+    assert completer.complete('q.') == (0, ['q.distance', 'q.x'])
+    assert len(completer._attributes) == cached
+
+
+def test_modules():
+    completer = Completer({})
+    assert completer.wait_for_modules(30)
+    start, candidates = completer.complete('import json')
+    assert start == 7
+    assert 'json' in candidates
+    assert completer.complete('from json.dec') == (5, ['json.decoder'])
@@ -5,6 +5,7 @@ import re
 import time
 import tty
 import pytest
+from turm.highlighting import NUMBER, STRING
 from virtual_terminal import VirtualTerminal
 
 
@@ -115,3 +116,109 @@ def test_left_right_wrapping(editor):
     editor.move_cursor_right()
     editor.insert('bar')
     editor.check('hellofoo\nbarworld', 8, 2)
+
+
+def test_insert_text(editor):
+    editor.insert('hello')
+    editor.move_cursor_left(2)
+    editor.insert_text('foo\nbar\nfizz')
+    editor.check('helfoo\nbar\nfizzlo', 9, 3)
+
+
+def test_insert_text_redraws_once(editor):
+    raw_length = len(editor.vterm.raw_input())
+    editor.insert_text('a' * 100)
+    editor.check('a' * 100, 105)
+    # the block is drawn in one go
+    assert editor.vterm.raw_input()[raw_length:].count('a' * 100) == 1
+
+
+def test_only_changed_lines_are_redrawn(editor):
+    editor.insert('foo\nbar\nfizz')
+    raw_length = len(editor.vterm.raw_input())
+    editor.move_cursor_up()
+    editor.move_cursor_left()
+    # moving the cursor only moves the cursor
+    assert editor.vterm.raw_input()[raw_length:] == '\x1b[2;8H\x1b[2;7H'
+
+    raw_length = len(editor.vterm.raw_input())
+    editor.insert('z')
+    # only the changed cells are written
+    assert editor.vterm.raw_input()[raw_length:] == 'zr\x1b[2;8H'
+    editor.check('foo\nbazr\nfizz', 8, 2)
+
+
+def test_backspace_newline_clears_last_line(editor):
+    editor.insert('foo\nbar\nfizz')
+    editor.move_cursor_up(1)
+    editor.move_cursor_left(3)
+    editor.backspace()
+    editor.check('foobar\nfizz', 8, 1)
+
+
+def test_reset_after_output(editor):
+    editor.insert('foo\nbar')
+    writes = len(editor.vterm.raw_input())
+    editor.write_output('\nfoo\nbar\n')
+    editor.reset()
+    # the prompt goes where the output left the cursor, without a query
+    assert '\x1b[6n' not in editor.vterm.raw_input()[writes:]
+    assert str(editor.vterm).rstrip() == '>>> foo\n... bar\nfoo\nbar\n>>>'
+    assert (editor.vterm.row, editor.vterm.column) == (5, 5)
+    assert str(editor.edit_field) == ''
+
+    editor.insert('x')
+    assert str(editor.vterm).rstrip().endswith('\n>>> x')
+    assert str(editor.edit_field) == 'x'
+
+
+def test_only_visible_rows_are_drawn(editor):
+    drawn = []
+    get_line = editor.edit_field._text.get_line
+
+    def get_drawn_line(row):
+        drawn.append(row)
+        return get_line(row)
+
+    editor.edit_field._text.get_line = get_drawn_line
+
+    editor.insert_text('\n'.join(str(i) for i in range(10000)))
+    visible = editor.visible_rows()
+    assert visible == range(9950, 10000)
+    assert drawn == list(visible)
+
+    # editing a line near the end draws just that line, like editing a short field
+    editor.move_cursor_up()
+    drawn.clear()
+    raw_length = len(editor.vterm.raw_input())
+    editor.insert('x')
+    assert drawn == [9998]
+    assert editor.vterm.raw_input()[raw_length:] == 'x'
+
+    # a newline damages every row below it, but only the visible ones are drawn
+    drawn.clear()
+    editor.newline()
+    assert drawn == [9998, 9999]
+    assert editor.visible_rows() == visible
+
+
+def test_highlighting_redraws_rows_an_edit_recolours():
+    vterm = VirtualTerminal()
+    edit_field = EditField(istream=vterm, ostream=vterm, highlight=True)
+    edit_field.insert_text('x = 1\ny = 2')
+
+    def attribute(row, column):
+        screen_row = edit_field._viewport.screen_row_of(row) - 1
+        return edit_field._term._front.get_attribute(screen_row, column + 4)
+
+    assert attribute(1, 4) == NUMBER
+    edit_field.move_cursor_up()
+    edit_field.move_cursor_left(5)
+    edit_field.insert_text('"""')
+    assert [attribute(1, column) for column in range(5)] == [STRING] * 5
+
+    # closing the string colours the row again
+    for _ in range(3):
+        edit_field.backspace()
+    assert attribute(1, 0) == 0
+    assert attribute(1, 4) == NUMBER
@@ -29,6 +29,8 @@ import pytest
     ('\x1b[2K', ec.EraseLine),
     ('\x1b[6n', ec.RequestCursorPosition),
     ('\x1b[12;34R', ec.ReportedCursorPosition),
+    ('\x1b[0m', ec.SelectGraphicRendition),
+    ('\x1b[94m', ec.SelectGraphicRendition),
 ])
 def test_parsing_code(code_str, code_class):
     # parse each stage of the partial code before parsing the full code
@@ -39,3 +41,114 @@ def test_parsing_code(code_str, code_class):
     code = parse_escape_code(code_str)
     assert isinstance(code, code_class)
     assert str(code) == code_str
+
+
+def test_tokenizer_splits_text_and_codes():
+    tokenizer = ec.Tokenizer()
+    tokens = list(tokenizer.feed('hello\x1b[3Dworld\n\x1b[A\t!'))
+    assert tokens[0] == 'hello'
+    assert isinstance(tokens[1], ec.MoveCursorLeft)
+    assert tokens[1].amount == 3
+    assert tokens[2:4] == ['world', '\n']
+    assert isinstance(tokens[4], ec.MoveCursorUp)
+    assert tokens[5:] == ['\t', '!']
+
+
+def test_tokenizer_resumes_between_chunks():
+    tokenizer = ec.Tokenizer()
+    tokens = []
+    for char in 'a\x1b[12;34Rb':
+        tokens.extend(tokenizer.feed(char))
+    assert tokens[0] == 'a'
+    assert isinstance(tokens[1], ec.ReportedCursorPosition)
+    assert (tokens[1].row, tokens[1].column) == (12, 34)
+    assert tokens[2] == 'b'
+    assert not tokenizer.in_sequence()
+
+    assert list(tokenizer.feed('\x1b[20')) == []
+    assert tokenizer.in_sequence()
+    assert isinstance(list(tokenizer.feed('0~'))[0], ec.BracketedPasteStart)
+
+
+@pytest.mark.parametrize('sequence', [
+    '\x1b[5;5;5A',
+    '\x1b[1;5X',
+    '\x1b[>1u',
+    '\x1b[1 q',
+    '\x1bx',
+])
+def test_tokenizer_skips_unknown_sequences(sequence):
+    tokenizer = ec.Tokenizer()
+    assert list(tokenizer.feed(f'a{sequence}b')) == ['a', 'b']
+
+
+@pytest.mark.parametrize('sequence, code', [
+    ('\x1b[0A', ec.MoveCursorUp(1)),
+    ('\x1b[0B', ec.MoveCursorDown(1)),
+    ('\x1b[0C', ec.MoveCursorRight(1)),
+    ('\x1b[0D', ec.MoveCursorLeft(1)),
+    ('\x1b[0G', ec.MoveCursorToColumn(1)),
+    ('\x1b[0;0H', ec.MoveCursorTo(1, 1)),
+    ('\x1b[0;5R', ec.ReportedCursorPosition(1, 5)),
+    ('\x1b[0m', ec.SelectGraphicRendition(0)),
+])
+def test_tokenizer_zero_parameters(sequence, code):
+    # a zero is the default of 1 for the codes that count from 1
+    assert list(ec.Tokenizer().feed(sequence)) == [code]
+
+
+def test_tokenizer_ss3_and_controls():
+    tokenizer = ec.Tokenizer()
+    tokens = list(tokenizer.feed('\x1bOB\x1b[\x031A'))
+    assert isinstance(tokens[0], ec.MoveCursorDown)
+    # a control character in a sequence is passed through without ending it
+    assert tokens[1] == '\x03'
+    assert isinstance(tokens[2], ec.MoveCursorUp)
+
+
+def test_parse_unknown_sequence():
+    with pytest.raises(Exception):
+        parse_escape_code('\x1b[1;5X')
+
+
+def test_code_classes_are_immutable_values():
+    code = ec.MoveCursorTo(2, column=5)
+    assert code == ec.MoveCursorTo(row=2, column=5)
+    assert code != ec.MoveCursorTo(5, 2)
+    assert code != ec.ReportedCursorPosition(2, 5)
+    assert len({code, ec.MoveCursorTo(2, 5), ec.MoveCursorUp()}) == 2
+    assert repr(code) == 'MoveCursorTo(row=2, column=5)'
+    assert ec.MoveCursorUp() == ec.MoveCursorUp(1)
+
+    with pytest.raises(AttributeError):
+        code.row = 3
+    with pytest.raises(AttributeError):
+        code.other = 3
+    assert not hasattr(code, '__dict__')
+
+
+def test_code_class_arguments():
+    with pytest.raises(TypeError):
+        ec.MoveCursorTo(1)
+    with pytest.raises(TypeError):
+        ec.MoveCursorUp(1, 2)
+    with pytest.raises(TypeError):
+        ec.MoveCursorUp(distance=1)
+
+
+def test_cached_encoders():
+    assert ec.move_cursor_to(3, 4) == '\x1b[3;4H'
+    assert ec.move_cursor_to(3, 4) is ec.move_cursor_to(3, 4)
+    assert ec.move_cursor_left(1) == '\x1b[D'
+    assert ec.move_cursor_left(4) == '\x1b[4D'
+    assert ec.erase_line() is ec.ERASE_LINE
+    with pytest.raises(Exception):
+        ec.move_cursor_up(0)
+
+
+def test_bytes_encoders():
+    assert ec.b.move_cursor_to(3, 4) == b'\x1b[3;4H'
+    assert ec.b.move_cursor_up() == b'\x1b[A'
+    assert ec.b.move_cursor_left(5) == b'\x1b[5D'
+    assert ec.b.ERASE_LINE == b'\x1b[2K'
+    assert ec.b.select_graphic_rendition(0, ec.BRIGHT + ec.BLUE) == b'\x1b[0;94m'
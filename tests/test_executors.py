@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from turm.executors import InlineExecutor, ProcessExecutor, ThreadExecutor
+
+
+def test_inline_executor():
+    executor = InlineExecutor()
+    calls = []
+    job = executor.submit(lambda: calls.append(threading.get_ident()))
+    assert job.done()
+    assert job.exception is None
+    assert calls == [threading.get_ident()]
+    assert not executor.interrupt()
+
+
+def test_exceptions_are_kept():
+    job = InlineExecutor().submit(lambda: 1 / 0)
+    assert isinstance(job.exception, ZeroDivisionError)
+
+
+def test_thread_executor():
+    executor = ThreadExecutor()
+    release = threading.Event()
+    job = executor.submit(release.wait)
+    assert not job.wait(0.01)
+
+    finished = []
+    job.add_done_callback(finished.append)
+    release.set()
+    assert job.wait(5)
+    assert finished == [job]
+    assert job.exception is None
+
+    # a callback added after the job is done is called straight away
+    job.add_done_callback(finished.append)
+    assert finished == [job, job]
+    executor.shutdown()
+
+
+def test_interrupt():
+    executor = ThreadExecutor()
+    assert not executor.interrupt()
+
+    started = threading.Event()
+
+    def spin():
+        started.set()
+        while True:
+            time.sleep(0.001)
+
+    job = executor.submit(spin)
+    assert started.wait(5)
+    assert executor.interrupt()
+    assert job.wait(5)
+    assert isinstance(job.exception, KeyboardInterrupt)
+
+    # the worker carries on with the next job
+    job = executor.submit(lambda: None)
+    assert job.wait(5)
+    assert job.exception is None
+    executor.shutdown()
+
+
+class _Output:
+
+    def __init__(self):
+        self.chunks = []
+        self.flushes = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def flush(self):
+        self.flushes += 1
+
+    def text(self):
+        return ''.join(self.chunks)
+
+
+def _run(executor, source, symbol='exec'):
+    output = _Output()
+    job = executor.submit_code(compile(source, '<input>', symbol), output)
+    assert job.wait(10)
+    return job, output.text()
+
+
+def test_process_executor():
+    executor = ProcessExecutor()
+    try:
+        job, output = _run(executor, 'import os\nx = 2\nprint(os.getpid())')
+        assert job.exception is None
+        assert int(output) != os.getpid()
+
+        # variables last from one statement to the next
+        job, output = _run(executor, 'x * 21', 'single')
+        assert output == '42\n'
+
+        job, output = _run(executor, '1 / 0')
+        assert job.exception is None
+        assert 'ZeroDivisionError: division by zero' in output
+        assert 'process_worker' not in output
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_interrupt():
+    executor = ProcessExecutor()
+    try:
+        assert not executor.interrupt()
+        output = _Output()
+        job = executor.submit_code(
+            compile('print("start")\nwhile True: pass', '<input>', 'exec'),
+            output)
+        # the worker is unbuffered, so the newline can come in a chunk of its own
+        while 'start\n' not in output.text():
+            time.sleep(0.01)
+        assert executor.interrupt()
+        assert job.wait(10)
+        assert output.text().startswith('start\nTraceback')
+        assert output.text().endswith('KeyboardInterrupt\n')
+
+        job, output = _run(executor, 'print("still running")')
+        assert output == 'still running\n'
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_replaces_workers():
+    executor = ProcessExecutor(spares=1)
+    try:
+        spare = executor._spares[0]
+        job, output = _run(executor, 'x = 1\nimport os\nos._exit(3)')
+        assert job.exception is None
+        assert 'exited with code 3' in output
+        assert executor._worker is spare
+
+        job, output = _run(executor, 'x', 'single')
+        assert 'NameError' in output
+
+        job, output = _run(executor, 'raise SystemExit(5)')
+        assert isinstance(job.exception, SystemExit)
+        assert job.exception.code == 5
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_shutdown_while_running():
+    executor = ProcessExecutor()
+    workers = [executor._worker, *executor._spares]
+    job = executor.submit_code(compile('while True: pass', '<input>', 'exec'),
+                               _Output())
+    executor.shutdown()
+    assert job.done()
+    assert all(worker.process.poll() is not None for worker in workers)
@@ -0,0 +1,80 @@
+from turm.gap_buffer import GapBuffer
+import random
+import pytest
+
+
+def test_insert_and_pop():
+    gb = GapBuffer()
+    for i, char in enumerate('hello world'):
+        gb.insert(i, char)
+    assert str(gb) == 'hello world'
+
+    gb.insert(5, ',')
+    assert str(gb) == 'hello, world'
+    assert gb.pop(5) == ','
+    assert gb.pop(0) == 'h'
+    assert str(gb) == 'ello world'
+    assert len(gb) == 10
+
+
+def test_pop_out_of_range():
+    gb = GapBuffer('abc')
+    with pytest.raises(IndexError):
+        gb.pop(3)
+
+
+def test_grows_past_capacity():
+    gb = GapBuffer(capacity=1)
+    for char in 'abcdefgh':
+        gb.insert(len(gb), char)
+    gb.insert(0, '_')
+    assert str(gb) == '_abcdefgh'
+
+
+def test_index_and_slices_across_gap():
+    gb = GapBuffer('hello\nworld\nfoo')
+    gb.insert(8, '!')
+    assert str(gb) == 'hello\nwo!rld\nfoo'
+    assert gb.index('\n') == 5
+    assert gb.index('\n', 6) == 12
+    assert gb[3:10] == list('lo\nwo!r')
+    assert gb[-1] == 'o'
+    with pytest.raises(ValueError):
+        gb.index('\n', 13)
+
+
+def test_matches_list():
+    rng = random.Random(42)
+    gb = GapBuffer(capacity=4)
+    reference = []
+    for _ in range(2000):
+        index = rng.randint(0, len(reference))
+        if reference and rng.random() < 0.4:
+            index = min(index, len(reference) - 1)
+            assert gb.pop(index) == reference.pop(index)
+        else:
+            char = rng.choice('ab\n')
+            gb.insert(index, char)
+            reference.insert(index, char)
+
+        assert len(gb) == len(reference)
+        start = rng.randint(0, len(reference))
+        stop = rng.randint(start, len(reference))
+        assert gb[start:stop] == reference[start:stop]
+        if '\n' in reference[start:]:
+            assert gb.index('\n', start) == reference.index('\n', start)
+
+    assert str(gb) == ''.join(reference)
+    assert list(gb) == reference
+
+
+def test_slice_assignment():
+    gb = GapBuffer('hello world', capacity=2)
+    gb[5:5] = ', big'
+    assert str(gb) == 'hello, big world'
+    del gb[0:7]
+    assert str(gb) == 'big world'
+    gb[0:3] = 'small'
+    assert str(gb) == 'small world'
+    del gb[-1]
+    assert str(gb) == 'small worl'
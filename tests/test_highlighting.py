@@ -0,0 +1,77 @@
+import turm.highlighting as highlighting
+from turm.completeness import LineState
+from turm.highlighting import (BUILTIN, COMMENT, DEFINITION, KEYWORD, NUMBER,
+                               STRING, Highlighter, lex_line)
+
+
+def _tokens(text, start=LineState()):
+    spans, end = lex_line(text, start)
+    return [(text[start:end], attribute) for start, end, attribute in spans], end
+
+
+def test_lex_line():
+    tokens, end = _tokens('def area(r=2.5): return len("a\\"b") # done')
+    assert tokens == [('def', KEYWORD), ('area', DEFINITION), ('2.5', NUMBER),
+                      ('return', KEYWORD), ('len', BUILTIN),
+                      ('"a\\"b"', STRING), ('# done', COMMENT)]
+    assert end == LineState()
+
+    tokens, end = _tokens("x = rb'#' + 0x1f  # (")
+    assert tokens == [("rb'#'", STRING), ('0x1f', NUMBER), ('# (', COMMENT)]
+    assert not end.is_open()
+
+
+def test_state_across_lines():
+    tokens, end = _tokens('print(f"""a {x}')
+    assert tokens == [('print', BUILTIN), ('f"""a {x}', STRING)]
+    assert end == LineState('(', '"""')
+
+    tokens, end = _tokens('still in """ + str(1))', end)
+    assert tokens == [('still in """', STRING), ('str', BUILTIN),
+                      ('1', NUMBER)]
+    assert end == LineState()
+
+    assert _tokens('x = 1 + \\')[1] == LineState(continued=True)
+    assert _tokens('x = 1  # \\')[1] == LineState()
+
+
+def test_highlighter_lexes_until_state_converges(monkeypatch):
+    lexed = []
+    original = highlighting.lex_line
+
+    def lex_line(text, start=LineState()):
+        lexed.append(text)
+        return original(text, start)
+
+    monkeypatch.setattr(highlighting, 'lex_line', lex_line)
+    lines = ['x = 1', 'y = 2', 'z = 3', 'w = 4']
+    highlighter = Highlighter()
+    assert highlighter.spans(3, lines.__getitem__) == ((4, 5, NUMBER), )
+    assert lexed == lines
+
+    # an edit that doesn't change the state only lexes the edited line
+    lexed.clear()
+    lines[1] = 'y = 22'
+    assert highlighter.update(1, 1, 4, lines.__getitem__) == 1
+    highlighter.spans(3, lines.__getitem__)
+    assert lexed == ['y = 22']
+
+    # opening a string lexes the following lines again
+    lexed.clear()
+    lines[1] = 'y = """'
+    assert highlighter.update(1, 1, 4, lines.__getitem__) == 3
+    assert highlighter.spans(3, lines.__getitem__) == ((0, 5, STRING), )
+    assert lexed == ['y = """', 'z = 3', 'w = 4']
+
+    # a row inserted above keeps the spans of the rows below
+    lexed.clear()
+    lines[1] = 'y = 2'
+    lines.insert(0, '# start')
+    highlighter.insert_rows(0)
+    highlighter.spans(4, lines.__getitem__)
+    assert lexed == ['# start', 'y = 2', 'z = 3', 'w = 4']
+    lexed.clear()
+    del lines[2]
+    highlighter.delete_rows(2)
+    highlighter.spans(3, lines.__getitem__)
+    assert lexed == []
@@ -0,0 +1,57 @@
+from turm.history import History
+
+
+def test_add_and_recall(tmp_path):
+    path = tmp_path / 'history'
+    history = History(path)
+    assert len(history) == 0
+    history.add('x = 1')
+    history.add('for i in range(3):\n    print(i)\n')
+    history.add('for i in range(3):\n    print(i)\n')  # repeats aren't kept
+    history.add('   ')
+    assert len(history) == 2
+    assert history[1] == 'for i in range(3):\n    print(i)'
+
+    # the file is appended to and loaded again
+    assert path.read_bytes() == b'x = 1\0for i in range(3):\n    print(i)\0'
+    history = History(path)
+    assert list(history) == ['x = 1', 'for i in range(3):\n    print(i)']
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'history'
+    path.write_bytes(b'')
+    assert len(History(path)) == 0
+
+
+def test_search():
+    history = History()
+    for entry in ['import os', 'x = 1', 'print(x)', 'os.getcwd()']:
+        history.add(entry)
+
+    assert history.search('os') == 3
+    assert history.search('os', 3) == 0
+    assert history.search('os', 0) is None
+    assert history.search('x') == 2
+    assert history.search('nothing') is None
+    assert history.search('') == 3
+
+    # prefix searches only match the start of entries
+    assert history.search('x', prefix=True) == 1
+    assert history.search('os', prefix=True) == 3
+    assert history.search('os', 3, prefix=True) is None
+
+    history.add('x += 1')
+    assert history.search('x', prefix=True) == 4
+
+
+def test_search_many_entries():
+    # How fast this is is measured by benchmarks/bench_history.py.
+    history = History()
+    for i in range(100_000):
+        history.add(f'value_{i} = compute({i})')
+
+    assert history.search('value_5 =') == 5
+    assert history.search('compute(99999)') == 99999
+    assert history.search('value_5 =', 5) is None
+    assert history.search('value_1', prefix=True) == 19999
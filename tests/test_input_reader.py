@@ -0,0 +1,75 @@
+from turm.input_reader import InputReader
+import os
+import pytest
+
+
+@pytest.fixture
+def pipe():
+    read_fd, write_fd = os.pipe()
+    yield read_fd, write_fd
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_get_char(pipe):
+    read_fd, write_fd = pipe
+    reader = InputReader(read_fd)
+    assert reader.get_char() is None
+
+    os.write(write_fd, b'hi')
+    assert reader.get_char() == 'h'
+    assert reader.get_char() == 'i'
+    assert reader.get_char() is None
+    reader.close()
+    assert os.get_blocking(read_fd)
+
+
+def test_split_multibyte_character(pipe):
+    read_fd, write_fd = pipe
+    reader = InputReader(read_fd)
+    data = 'é'.encode('utf-8')
+    os.write(write_fd, data[:1])
+    assert reader.get_char() is None
+    os.write(write_fd, data[1:])
+    assert reader.get_char() == 'é'
+
+
+def test_large_input(pipe):
+    read_fd, write_fd = pipe
+    reader = InputReader(read_fd, buffer_size=16)
+    os.write(write_fd, b'x' * 1000)
+    assert reader.read_available() == 'x' * 1000
+    assert reader.get_char() is None
+
+
+def test_read_and_discard(pipe):
+    read_fd, write_fd = pipe
+    reader = InputReader(read_fd)
+    os.write(write_fd, b'\x1b[3;4Rabc\x03def\x03gh')
+    assert reader.read(2) == '\x1b['
+    assert reader.read(4) == '3;4R'
+    assert reader.discard_through('\x03')
+    assert reader.read_available() == 'gh'
+    assert not reader.discard_through('\x03')
+
+
+def test_unread(pipe):
+    read_fd, write_fd = pipe
+    reader = InputReader(read_fd)
+    os.write(write_fd, b'abcd')
+    assert reader.read(2) == 'ab'
+    reader.unread('xy')
+    assert reader.read_available() == 'xycd'
+
+
+def test_end_of_input():
+    read_fd, write_fd = os.pipe()
+    reader = InputReader(read_fd)
+    os.write(write_fd, b'ab')
+    os.close(write_fd)
+    assert reader.read_available() == 'ab'
+    assert reader.eof
+    with pytest.raises(EOFError):
+        reader.read(1)
+    reader.close()
+    os.close(read_fd)
@@ -0,0 +1,70 @@
+import pytest
+from pty_session import CURSOR_QUERY, PtySession
+
+THREADED = '''
+from turm.executors import ThreadExecutor
+from turm.interpreter import Interpreter
+try:
+    Interpreter(executor=ThreadExecutor()).run_forever()
+except SystemExit:
+    pass
+'''
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = PtySession(THREADED, tmp_path)
+    session.read_until(CURSOR_QUERY)
+    yield session
+    session.close()
+
+
+def test_input_on_a_thread(session):
+    session.write('name = input("name? ")\n')
+    session.read_until(b'name? ')
+    session.write('turmx\x7f\n')
+    session.write('print(name * 2)\n')
+    session.read_until(b'turmturm')
+
+    # ctrl-d ends the input
+    session.write('input()\n')
+    session.write('\x04')
+    session.read_until(b'EOFError')
+    session.write('exit(0)\n')
+    assert session.wait() == 0
+
+
+def test_interrupt_input_on_a_thread(session):
+    session.write('input()\n')
+    session.write('abc')
+    session.read_until(b'abc')
+    session.write('\x03')
+    session.read_until(b'KeyboardInterrupt')
+    assert b'abc\r\nTraceback' in session.output
+    assert b'turm' not in session.output.partition(b'Traceback')[2]
+    session.write('print(40 + 2)\n')
+    session.read_until(b'42')
+    session.write('exit(0)\n')
+    assert session.wait() == 0
+
+
+def test_wake_up_after_exit(tmp_path):
+    session = PtySession(
+        'import os\n'
+        'from turm.executors import ThreadExecutor\n'
+        'from turm.interpreter import Interpreter\n'
+        'interpreter = Interpreter(executor=ThreadExecutor())\n'
+        'interpreter._reset_term()\n'
+        '# The descriptors of the wake up pipe are reused.\n'
+        'read_fd, write_fd = os.pipe()\n'
+        'os.set_blocking(read_fd, False)\n'
+        'interpreter._wake_up()\n'
+        'try:\n'
+        '    os.read(read_fd, 1)\n'
+        'except BlockingIOError:\n'
+        '    print("not woken")\n', tmp_path)
+    try:
+        session.read_until(b'not woken')
+        assert session.wait() == 0
+    finally:
+        session.close()
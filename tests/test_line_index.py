@@ -0,0 +1,58 @@
+from turm.line_index import LineIndex
+import random
+
+
+def _line_offsets(text):
+    return [0] + [i + 1 for i, char in enumerate(text) if char == '\n']
+
+
+def test_insert_and_delete():
+    index = LineIndex()
+    index.insert(0, 'hello\nworld')
+    assert index.line_count() == 2
+    assert index.line_offsets() == [0, 6]
+
+    index.insert(2, '\n\n')
+    # 'he\n\nllo\nworld'
+    assert index.line_offsets() == [0, 3, 4, 8]
+    assert index.line_end(2) == 7
+    assert index.line_end(3) == 13
+
+    index.delete(2, 3)
+    # 'he\nllo\nworld'
+    assert index.line_offsets() == [0, 3, 7]
+
+
+def test_row_of():
+    index = LineIndex()
+    index.insert(0, 'ab\ncd\n\nef')
+    index.insert(1, 'x')
+    # 'axb\ncd\n\nef'
+    assert [index.row_of(i) for i in range(11)] == [
+        0, 0, 0, 0, 1, 1, 1, 2, 3, 3, 3
+    ]
+
+
+def test_matches_naive_scan():
+    rng = random.Random(7)
+    index = LineIndex()
+    text = ''
+    for _ in range(1000):
+        position = rng.randint(0, len(text))
+        if text and rng.random() < 0.4:
+            end = min(position + rng.randint(1, 3), len(text))
+            position = min(position, end - 1)
+            text = text[:position] + text[end:]
+            index.delete(position, end)
+        else:
+            chars = ''.join(rng.choice('ab\n') for _ in range(rng.randint(1, 3)))
+            text = text[:position] + chars + text[position:]
+            index.insert(position, chars)
+
+        offsets = _line_offsets(text)
+        assert index.line_offsets() == offsets
+        assert index.line_count() == len(offsets)
+        probe = rng.randint(0, len(text))
+        assert index.row_of(probe) == text.count('\n', 0, probe)
+        row = rng.randrange(len(offsets))
+        assert index.line_start(row) == offsets[row]
@@ -0,0 +1,75 @@
+import io
+import time
+from turm.output_capture import OutputCapture
+
+
+def _capture(max_lines=6, max_line_length=10):
+    output = io.StringIO()
+    return output, OutputCapture(output, max_lines, max_line_length)
+
+
+def test_writes_are_held_until_rendered():
+    output, capture = _capture()
+    capture.write('a')
+    capture.write('b\nc')
+    assert output.getvalue() == ''
+    capture.render()
+    assert output.getvalue() == 'ab\nc'
+    capture.write('\n')
+    capture.render()
+    capture.render()
+    assert output.getvalue() == 'ab\nc\n'
+
+
+def test_flush_renders():
+    output, capture = _capture()
+    capture.write('name? ')
+    capture.flush()
+    assert output.getvalue() == 'name? '
+
+
+def test_middle_of_flood_is_skipped():
+    output, capture = _capture()
+    capture.write(''.join(f'{i}\n' for i in range(100)))
+    capture.write('100\n')
+    capture.render()
+    assert output.getvalue() == '0\n1\n2\n[... 95 lines skipped ...]\n98\n99\n100\n'
+
+    # each frame has its own limit
+    capture.write('a\nb\n')
+    capture.render()
+    assert output.getvalue().endswith('100\na\nb\n')
+
+
+def test_long_lines_are_cut():
+    output, capture = _capture()
+    capture.write('x' * 25 + '\n')
+    capture.write('y' * 8)
+    capture.write('y' * 8)
+    capture.render()
+    assert output.getvalue() == ('x' * 10 + ' [... 15 characters skipped]\n' +
+                                 'y' * 10 + ' [... 6 characters skipped]')
+
+
+def test_discard():
+    output, capture = _capture()
+    capture.write('lost\nlost')
+    capture.discard()
+    capture.write('kept\n')
+    capture.render()
+    assert output.getvalue() == 'kept\n'
+
+
+def test_frames_are_rendered_while_started():
+    output, capture = _capture()
+    capture.start()
+    try:
+        capture.write('hello\n')
+        deadline = time.monotonic() + 5
+        while not output.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert output.getvalue() == 'hello\n'
+        capture.write('bye')
+    finally:
+        capture.stop()
+    assert output.getvalue() == 'hello\nbye'
@@ -0,0 +1,38 @@
+from turm.prompts import Prompts
+
+
+def test_default_prompts():
+    prompts = Prompts('>>> ', '... ')
+    assert prompts[0] == '>>> '
+    assert prompts[1] == '... '
+    assert prompts[10000] == '... '
+    prompts.insert_rows(1, 5)
+    prompts.delete_rows(1, 2)
+    assert prompts[0] == '>>> '
+    assert prompts[3] == '... '
+
+
+def test_overrides_move_with_their_rows():
+    prompts = Prompts('>>> ', '... ')
+    prompts[2] = '(2) '
+    prompts[5] = '(5) '
+
+    prompts.insert_rows(3, 2)
+    assert prompts[2] == '(2) '
+    assert prompts[5] == '... '
+    assert prompts[7] == '(5) '
+
+    # deleting a row drops its prompt
+    prompts.delete_rows(2)
+    assert prompts[2] == '... '
+    assert prompts[6] == '(5) '
+
+    del prompts[6]
+    assert prompts[6] == '... '
+
+
+def test_clear():
+    prompts = Prompts()
+    prompts[0] = 'In: '
+    prompts.clear()
+    assert prompts[0] == '>>> '
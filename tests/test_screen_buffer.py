@@ -0,0 +1,71 @@
+from turm.screen_buffer import BLANK, UNKNOWN, ScreenBuffer
+
+
+def _rows(buffer):
+    return [buffer.text(row).rstrip() for row in range(buffer.height)]
+
+
+def test_write_and_text():
+    buffer = ScreenBuffer(10, 3)
+    assert buffer.get(0, 0) == UNKNOWN
+    buffer.write(1, 2, 'héllo world')
+    assert _rows(buffer) == ['', '  héllo wo', '']
+    assert buffer.get(1, 3) == ord('é')
+
+    # writing past the edge does nothing
+    buffer.write(1, 10, 'x')
+    assert buffer.text(1) == '  héllo wo'
+
+
+def test_fill_row_erases():
+    buffer = ScreenBuffer(10, 3)
+    buffer.write(0, 0, 'hello')
+    buffer.fill_row(0, BLANK, start=2)
+    assert buffer.row(0).tolist() == [ord('h'), ord('e')] + [BLANK] * 8
+    assert buffer.text(0) == 'he        '
+
+
+def test_copy_and_compare_rows():
+    front = ScreenBuffer(10, 3)
+    back = ScreenBuffer(10, 3)
+    back.write(2, 0, 'hello')
+    assert not front.row_equals(back, 2)
+    front.copy_row(back, 2, 0, 3)
+    assert front.text(2).rstrip() == 'hel'
+    front.copy_row(back, 2)
+    assert front.row_equals(back, 2)
+
+
+def test_scroll_up():
+    buffer = ScreenBuffer(5, 4)
+    for row in range(4):
+        buffer.write(row, 0, str(row))
+    buffer.scroll_up(3)
+    assert _rows(buffer) == ['3', '', '', '']
+    assert buffer.get(3, 0) == UNKNOWN
+
+
+def test_resized():
+    buffer = ScreenBuffer(5, 2)
+    buffer.write(0, 0, 'hello')
+    buffer.write(1, 0, 'world')
+    assert _rows(buffer.resized(3, 3)) == ['hel', 'wor', '']
+    assert _rows(buffer.resized(8, 1)) == ['hello']
+
+
+def test_attributes():
+    buffer = ScreenBuffer(10, 2, attributes=True)
+    other = ScreenBuffer(10, 2, attributes=True)
+    buffer.write(0, 0, 'if', attribute=3)
+    other.write(0, 0, 'if')
+    assert buffer.get_attribute(0, 1) == 3
+    assert buffer.get_attribute(0, 2) == 0
+    assert not buffer.row_equals(other, 0)
+
+    buffer.scroll_up(1)
+    assert buffer.get_attribute(0, 0) == 0
+
+
+def test_compact_storage():
+    buffer = ScreenBuffer(300, 80)
+    assert buffer.nbytes() == 300 * 80 * 4
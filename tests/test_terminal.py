@@ -0,0 +1,290 @@
+import fcntl
+import io
+import os
+import struct
+import termios
+import turm.terminal as terminal
+from turm.input_reader import InputReader
+from turm.screen_buffer import UNKNOWN
+from turm.terminal import Term
+from virtual_terminal import VirtualTerminal
+
+
+def _new_term(height=10, width=40):
+    vterm = VirtualTerminal(height=height, width=width)
+    term = Term(vterm, vterm)
+    return vterm, term
+
+
+def _output_of(vterm, func):
+    start = len(vterm.raw_input())
+    func()
+    return vterm.raw_input()[start:]
+
+
+def test_writes_are_buffered_until_flush():
+    vterm, term = _new_term()
+    output = _output_of(vterm, lambda: term.write('hello'))
+    assert output == ''
+    output = _output_of(vterm, term.flush)
+    assert output == 'hello'
+    assert str(vterm).rstrip() == 'hello'
+
+
+def test_flush_only_writes_changed_cells():
+    vterm, term = _new_term()
+    term.write('hello world')
+    term.flush()
+
+    term.move_cursor_to(1, 1)
+    term.write('hello there')
+    output = _output_of(vterm, term.flush)
+    assert output == '\x1b[1;7Hthere'
+    assert str(vterm).rstrip() == 'hello there'
+    assert (vterm.row, vterm.column) == (1, 12)
+
+    # nothing changed so only the cursor moves
+    term.move_cursor_to(2, 1)
+    assert _output_of(vterm, term.flush) == '\x1b[2;1H'
+    assert _output_of(vterm, term.flush) == ''
+
+
+def test_erase_line_uses_erase_code():
+    vterm, term = _new_term()
+    term.write('hello world')
+    term.flush()
+
+    term.move_cursor_to(1, 1)
+    term.erase_line()
+    term.write('hi')
+    output = _output_of(vterm, term.flush)
+    assert output == '\x1b[1;2Hi\x1b[0K'
+    assert str(vterm).rstrip() == 'hi'
+
+
+def test_attributes():
+    vterm, term = _new_term()
+    term.write('x = ')
+    term.write('len', 36)
+    term.write('(')
+    term.write('1', 33)
+    term.write('2', 1)
+    output = _output_of(vterm, term.flush)
+    assert output == 'x = \x1b[36mlen\x1b[0m(\x1b[33m1\x1b[0;1m2\x1b[0m'
+    assert str(vterm).rstrip() == 'x = len(12'
+
+    # a cell that only changes its attribute is drawn again
+    term.move_cursor_to(1, 1)
+    term.write('x', 35)
+    output = _output_of(vterm, term.flush)
+    assert output == '\x1b[1;1H\x1b[35mx\x1b[0m'
+
+
+def test_undrawn_cells_are_left_alone():
+    vterm, term = _new_term()
+    vterm.write('existing output')
+    term.move_cursor_to(2, 1)
+    term.write('>>> ')
+    term.flush()
+    assert str(vterm).rstrip() == 'existing output\n>>>'
+
+
+def test_flush_is_one_write():
+    vterm, term = _new_term()
+    for row in range(1, 4):
+        term.move_cursor_to(row, 1)
+        term.write(f'line {row}')
+    writes = len(vterm._raw_input)
+    term.flush()
+    assert len(vterm._raw_input) == writes + 1
+    assert str(vterm).rstrip() == 'line 1\nline 2\nline 3'
+
+    # nothing changed, so nothing is written
+    term.flush()
+    assert len(vterm._raw_input) == writes + 1
+
+
+class _FileTerminal(VirtualTerminal):
+    encoding = 'utf-8'
+
+    def __init__(self, fd):
+        super().__init__(height=10, width=40)
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+
+def test_flush_writes_to_file_descriptor():
+    read_fd, write_fd = os.pipe()
+    try:
+        vterm = _FileTerminal(write_fd)
+        term = Term(vterm, vterm)
+        term.write('héllo')
+        term.flush()
+        assert os.read(read_fd, 100) == 'héllo'.encode('utf-8')
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_binary_mode():
+    read_fd, write_fd = os.pipe()
+    try:
+        vterm = _FileTerminal(write_fd)
+        term = Term(vterm, vterm, binary=True)
+        term.write('héllo')
+        term.move_cursor_to(2, 3)
+        term.flush()
+        assert os.read(read_fd, 100) == 'héllo\x1b[2;3H'.encode('utf-8')
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def _set_window_size(fd, rows, columns):
+    fcntl.ioctl(fd, termios.TIOCSWINSZ,
+                struct.pack('HHHH', rows, columns, 0, 0))
+
+
+def test_size_from_tty_and_resize(monkeypatch):
+    master_fd, slave_fd = os.openpty()
+    try:
+        _set_window_size(slave_fd, 20, 60)
+        vterm = _FileTerminal(slave_fd)
+        term = Term(vterm, vterm)
+        assert (term.screen_width, term.screen_height) == (60, 20)
+        # only the cursor position was requested, not the screen size
+        assert vterm.raw_input() == '\x1b[6n'
+
+        term.write('hello')
+        term.flush()
+        os.read(master_fd, 1000)
+
+        _set_window_size(slave_fd, 10, 30)
+        monkeypatch.setattr(terminal, '_resize_count',
+                            terminal._resize_count + 1)
+        term.flush()
+        assert (term.screen_width, term.screen_height) == (30, 10)
+        # everything is drawn again after a resize
+        assert os.read(master_fd, 1000) == b'\x1b[1;1Hhello'
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+def test_write_output_follows_the_cursor():
+    vterm, term = _new_term(height=5, width=10)
+    term.write_output('hello\n')
+    assert (term.row, term.column) == (2, 1)
+    assert (vterm.row, vterm.column) == (2, 1)
+
+    # the virtual terminal doesn't wrap or scroll, only the tracking is checked
+    term._ostream = io.StringIO()
+
+    # escape codes take no space and tabs move to the next tab stop
+    term.write_output('\x1b[31mab\x1b[0m\tc')
+    assert (term.row, term.column) == (2, 10)
+
+    # text wraps at the edge of the screen, the last column waits to wrap
+    term.write_output('d' + 'e' * 10)
+    assert (term.row, term.column) == (3, 11)
+    term.write_output('f')
+    assert (term.row, term.column) == (4, 2)
+
+    # the bottom row scrolls, and wide characters take two columns
+    term.write_output('\n\n\n界界\rg')
+    assert (term.row, term.column) == (5, 2)
+    term.write_output('\b')
+    assert (term.row, term.column) == (5, 1)
+
+    # strings like a window title are invisible up to their terminator
+    term.write_output('\x1b]0;a title\x07x\x1bP1$r\x1b\\y')
+    assert (term.row, term.column) == (5, 3)
+
+
+def test_reset_reuses_buffers():
+    vterm, term = _new_term()
+    term.write('hello')
+    term.flush()
+    back = term._back
+    cells = term._back.cells
+
+    term.write_output('\nout\n')
+    writes = len(vterm._raw_input)
+    term.reset()
+    assert term._back is back and term._back.cells is cells
+    assert len(vterm._raw_input) == writes
+
+    # nothing is known about the screen, so all that is written is drawn
+    term.write('hello')
+    assert _output_of(vterm, term.flush) == 'hello'
+    assert str(vterm).rstrip() == 'hello\nout\nhello'
+
+
+def test_reset_can_query_the_cursor():
+    vterm, term = _new_term()
+    term.write('>>> ')
+    term.flush()
+    term.write_output('\n')
+
+    # output that didn't go through the term, e.g. from a subprocess
+    vterm.write('untracked\n')
+    term.reset()
+    assert (term.row, term.column) == (2, 1)
+    term.reset(query_cursor=True)
+    assert (term.row, term.column) == (3, 1)
+
+    # a prompt after output on the same row leaves the output alone
+    vterm.write('out')
+    term.reset(query_cursor=True)
+    term.erase_line()
+    term.write('>>> ')
+    term.flush()
+    assert str(vterm).splitlines()[2] == 'out>>> '
+
+
+def test_cursor_query_keeps_typed_input():
+    read_fd, write_fd = os.pipe()
+    try:
+        vterm, term = _new_term()
+        term._istream = reader = InputReader(read_fd)
+        os.write(write_fd, b'x = 2\r\x1b[A\x1b[5;3R')
+        term.reset(query_cursor=True)
+        assert (term.row, term.column) == (5, 3)
+        assert reader.read_available() == 'x = 2\r\x1b[A'
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_cursor_query_drops_typed_input_it_cant_give_back():
+    vterm, term = _new_term()
+    vterm._istream_buffer = 'x = 2\r'
+    term.reset(query_cursor=True)
+    assert (term.row, term.column) == (vterm.row, vterm.column)
+    assert vterm._istream_buffer == ''
+
+
+def test_reset_when_waiting_to_wrap():
+    vterm, term = _new_term(height=5, width=10)
+    term._ostream = io.StringIO()
+    term.write_output('a' * 10)
+    assert (term.row, term.column) == (1, 11)
+    term.reset()
+    assert (term.row, term.column) == (2, 1)
+
+
+def test_write_output_scrolls_what_was_drawn():
+    vterm, term = _new_term(height=3, width=10)
+    term._ostream = io.StringIO()
+    term.move_cursor_to(2, 1)
+    term.write('>>> a')
+    term.move_cursor_to(3, 1)
+    term.flush()
+    term.write_output('out\n')
+    # the drawn row scrolled up by one and the rows of the output are unknown
+    assert term._back.text(0).rstrip() == '>>> a'
+    assert term._front.row_equals(term._back, 0)
+    assert term._back.get(1, 0) == UNKNOWN
+    assert term._back.get(2, 0) == UNKNOWN
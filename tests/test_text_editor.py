@@ -1,4 +1,6 @@
-from turm.interpreter import TextEditor
+from turm.text_editor import TextEditor
+from turm.gap_buffer import GapBuffer
+import pytest
 
 
 def test_text_editor_insert():
@@ -184,3 +186,81 @@ def test_get_line():
     assert sb.get_line(2) == 'fizz buzz\n'
     assert sb.get_line(3) == 'foo bar\n'
     assert sb.get_line(4) == 'fin'
+
+
+@pytest.mark.parametrize('buffer_type', [list, GapBuffer])
+def test_buffer_types(buffer_type):
+    sb = TextEditor(buffer_type=buffer_type)
+    for char in 'hello\nworld':
+        sb.insert(char)
+    sb.move_up(1)
+    sb.move_left(2)
+    sb.pop()
+    sb.insert('L')
+    assert str(sb) == 'helLo\nworld'
+    assert sb.get_row_and_column() == (0, 4)
+    assert sb.get_line(1) == 'world'
+
+
+def test_line_offsets():
+    sb = TextEditor()
+    for char in 'hello\nworld\nfin':
+        sb.insert(char)
+    sb.move_up(1)
+    sb.pop()
+    assert str(sb) == 'hello\nworldfin'
+    assert sb.line_count() == 2
+    assert sb.line_offsets() == [0, 6]
+
+
+@pytest.mark.parametrize('buffer_type', [list, GapBuffer])
+def test_insert_text(buffer_type):
+    sb = TextEditor(buffer_type=buffer_type)
+    sb.insert_text('hello world')
+    sb.move_left(6)
+    sb.insert_text('\nfoo\nbar')
+    assert str(sb) == 'hello\nfoo\nbar world'
+    assert sb.get_row_and_column() == (2, 3)
+    assert sb.line_offsets() == [0, 6, 10]
+
+
+@pytest.mark.parametrize('buffer_type', [list, GapBuffer])
+def test_delete_range(buffer_type):
+    sb = TextEditor(buffer_type=buffer_type)
+    sb.insert_text('hello\nfoo\nbar world')
+    assert sb.delete_range(5, 13) == '\nfoo\nbar'
+    assert str(sb) == 'hello world'
+    assert sb.line_count() == 1
+    # the cursor was after the deleted range so moves back with the text
+    assert sb.get_row_and_column() == (0, 11)
+
+    sb.move_left(8)
+    assert sb.delete_range(0, 6) == 'hello '
+    # the cursor was inside the deleted range so moves to its start
+    sb.insert('W')
+    assert str(sb) == 'Wworld'
+    assert sb.delete_range(4, 99) == 'ld'
+    assert sb.delete_range(3, 3) == ''
+    assert str(sb) == 'Wwor'
+
+
+def test_take_damage():
+    sb = TextEditor()
+    sb.insert_text('hello\nworld\nfin')
+    assert sb.take_damage() == (0, None)
+    assert sb.take_damage() is None
+
+    sb.move_up(1)
+    sb.insert('!')
+    sb.move_up(1)
+    sb.insert('!')
+    assert sb.take_damage() == (0, 1)
+
+    sb.move_down(1)
+    sb.move_down(1)
+    sb.move_left(3)
+    sb.pop()
+    assert sb.take_damage() == (2, 2)
+    sb.move_left(1)
+    sb.pop()
+    assert sb.take_damage() == (1, None)
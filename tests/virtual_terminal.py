@@ -85,6 +85,10 @@ class VirtualTerminal:
                 self.column = max(int(column), 1)
                 for i in range(len(m.group(0))):
                     chars.pop(0)
+            elif chars[:2] == ['0', 'K']:
+                del self._lines[self.row - 1][self.column - 1:]
+                chars.pop(0)
+                chars.pop(0)
             elif chars[:2] == ['2', 'K']:
                 self._lines[self.row - 1] = [' '] * (self.column - 1)
                 chars.pop(0)
@@ -93,6 +97,9 @@ class VirtualTerminal:
                 chars.pop(0)
                 chars.pop(0)
                 self._istream_buffer += f'\x1b[{self.row};{self.column}R'
+            elif m := re.match(r'[\d;]*m', ''.join(chars)):
+                # colours and other attributes aren't modelled
+                del chars[:len(m.group(0))]
             elif m := re.match(r'(\d+);(\d+)H', ''.join(chars)):
                 for i in range(len(m.group(0))):
                     chars.pop(0)
@@ -0,0 +1,104 @@
+import ast
+import asyncio
+import inspect
+import sys
+from turm.chars import Chars
+from turm.interpreter import Interpreter
+
+
+class AsyncInterpreter(Interpreter):
+    """An interpreter that runs inside an asyncio event loop.
+
+    Input is handled when the loop reports stdin is readable rather than by polling,
+    and code typed at the prompt can use top level `await`. While awaited code runs
+    the loop keeps going, input typed in the meantime is kept for when it finishes
+    and ctrl-c cancels it.
+    """
+
+    def __init__(self, locals=None, executor=None, history=None):
+        super().__init__(locals, executor, history)
+        if not self._executor.isolated:
+            # Awaited code runs in this process, so it can't be used when other
+            # code runs in a worker process.
+            self._compile.compiler.flags |= ast.PyCF_ALLOW_TOP_LEVEL_AWAIT
+        self._task = None
+        self._loop = None
+        self._done = None
+
+    def _run_code(self, code):
+        if not code.co_flags & inspect.CO_COROUTINE:
+            super()._run_code(code)
+            return
+
+        self._task = asyncio.get_running_loop().create_task(
+            self._await_code(code))
+
+    async def _await_code(self, code):
+        with self._output_to_editor():
+            try:
+                await eval(code, self._locals)
+            except SystemExit as e:
+                self._reset_term()
+                self._done.set_result(e.code)
+                return
+            except asyncio.CancelledError:
+                print('KeyboardInterrupt')
+            except Exception as e:
+                self._showtraceback(e, e.__traceback__.tb_next)
+            finally:
+                self._task = None
+
+        try:
+            self._reset_input_buffer(query_cursor=True)
+        except EOFError:
+            self._end_input()
+            self._done.set_result(None)
+            return
+        # Handle anything that was typed while the code was running.
+        self._update()
+
+    def _next_token(self):
+        # Leave input alone until the running code has finished.
+        while self._task is not None:
+            yield
+        return (yield from super()._next_token())
+
+    def _wake_up(self):
+        # Code running on a thread has finished or is reading input.
+        self._loop.call_soon_threadsafe(self._update)
+
+    def _update(self):
+        if self._done.done():
+            return  # a wake up came after exit was called
+        try:
+            self.update()
+        except SystemExit as e:
+            self._done.set_result(e.code)
+
+    def _on_readable(self):
+        if self._task is None:
+            self._update()
+            return
+
+        if self._input.discard_through(Chars.CTRL_C):
+            self._output.discard()
+            self._task.cancel()
+
+    async def run(self):
+        """Run the interpreter until `exit` is called, returning the exit code"""
+        self._loop = loop = asyncio.get_running_loop()
+        self._done = loop.create_future()
+        loop.add_reader(sys.stdin.fileno(), self._on_readable)
+        try:
+            self._update()
+            return await self._done
+        finally:
+            loop.remove_reader(sys.stdin.fileno())
+
+
+def main():
+    asyncio.run(AsyncInterpreter().run())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 class Chars:
     ESCAPE = '\x1b'
     CTRL_C = '\x03'
+    CTRL_D = '\x04'
+    CTRL_R = '\x12'
     BACKSPACE = '\x7f'
     TAB = '\t'
     NEWLINE = '\n'
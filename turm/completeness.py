@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+
+# Keywords that continue a compound statement rather than starting a new one.
+_CLAUSES = ('else', 'elif', 'except', 'finally')
+
+
+@dataclass(frozen=True, slots=True)
+class LineState:
+    """What is still open at the end of a line"""
+    brackets: str = ''
+    string: str | None = None
+    continued: bool = False
+
+    def is_open(self):
+        return bool(self.brackets or self.string or self.continued)
+
+
+_CLOSED = LineState()
+
+
+@dataclass(frozen=True, slots=True)
+class _Line:
+    text: str
+    start: LineState
+    end: LineState
+    opens_block: bool
+    starts_statement: bool
+    decorator: bool
+
+
+def _starts_clause(text):
+    word = text.lstrip().split(maxsplit=1)[0].rstrip(':')
+    return word in _CLAUSES
+
+
+def scan_line(text, start=_CLOSED):
+    """Scan a line for brackets, strings and comments, given the state before it"""
+    brackets = list(start.brackets)
+    string = start.string
+    last = ''
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if string:
+            if char == '\\':
+                index += 2
+            elif text.startswith(string, index):
+                index += len(string)
+                string = None
+                last = char
+            else:
+                index += 1
+            continue
+
+        if char == '#':
+            break
+        if char in '\'"':
+            if text.startswith(char * 3, index):
+                string = char * 3
+                index += 3
+                continue
+            # A single quoted string ends on the same line.
+            index += 1
+            while index < length and text[index] != char:
+                index += 2 if text[index] == '\\' else 1
+        elif char in '([{':
+            brackets.append(char)
+        elif char in ')]}':
+            if brackets:
+                brackets.pop()
+        if not char.isspace():
+            last = char
+        index += 1
+
+    continued = string is None and text.endswith('\\') and last == '\\'
+    end = LineState(''.join(brackets), string, continued)
+    significant = bool(text.strip()) and not text.lstrip().startswith('#')
+    top_level = not start.is_open() and significant and not text[0].isspace()
+    decorator = top_level and text.startswith('@')
+    return _Line(text=text,
+                 start=start,
+                 end=end,
+                 opens_block=(last == ':' and not end.is_open()) or decorator,
+                 starts_statement=top_level and not _starts_clause(text),
+                 decorator=decorator)
+
+
+class CompletenessChecker:
+    """Decides whether source typed at a prompt is ready to be compiled.
+
+    The state at the end of each line is kept, so when Enter is pressed only lines
+    that are new or have changed are scanned.
+    """
+
+    def __init__(self):
+        self._lines = []
+
+    def _scan(self, row, text, start):
+        if row < len(self._lines):
+            line = self._lines[row]
+            if line.text == text and line.start == start:
+                return line
+            line = self._lines[row] = scan_line(text, start)
+        else:
+            line = scan_line(text, start)
+            self._lines.append(line)
+        return line
+
+    def check(self, source):
+        """Return None if more lines are needed, otherwise the symbol to compile with
+
+        Single lines are ready unless they open a block or leave something open.
+        Source that opens a block needs an empty line at the end, as in the standard
+        interactive interpreter. Source ending in an empty line is always ready, so
+        the compiler has the last say.
+        """
+        texts = source.split('\n')
+        state = _CLOSED
+        statements = 0
+        opens_block = False
+        decorated = False
+        for row, text in enumerate(texts):
+            line = self._scan(row, text, state)
+            state = line.end
+            # A decorated definition is one statement.
+            if line.starts_statement and not decorated:
+                statements += 1
+            if line.starts_statement:
+                decorated = line.decorator
+            opens_block |= line.opens_block
+        del self._lines[len(texts):]
+
+        ended = len(texts) > 1 and not texts[-1].strip()
+        if not ended and (opens_block or state.is_open()):
+            return None
+        return 'single' if statements <= 1 else 'exec'
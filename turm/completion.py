@@ -0,0 +1,201 @@
+import builtins
+import importlib.util
+import keyword
+import pkgutil
+import re
+import sys
+import threading
+import weakref
+
+# Marks the node where a word ends, it can't be mistaken for a character.
+_END = ''
+
+_WORD = re.compile(r'[\w.]*$')
+_IMPORT = re.compile(r'\s*(import|from)\s+[\w.]*$')
+
+
+class PrefixTrie:
+    """A set of words that can be listed by prefix"""
+
+    def __init__(self, words=()):
+        self._root = {}
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            node[_END] = True
+            self._size += 1
+
+    def discard(self, word):
+        path = [self._root]
+        for char in word:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].pop(_END, None) is None:
+            return
+        self._size -= 1
+        # Remove the nodes that no longer lead to a word.
+        for index in range(len(word), 0, -1):
+            if path[index]:
+                break
+            del path[index - 1][word[index - 1]]
+
+    def with_prefix(self, prefix):
+        """Return the words that start with `prefix`, sorted"""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        words = []
+        stack = [(prefix, node)]
+        while stack:
+            word, node = stack.pop()
+            for char, child in node.items():
+                if char == _END:
+                    words.append(word)
+                else:
+                    stack.append((word + char, child))
+        words.sort()
+        return words
+
+    def __contains__(self, word):
+        node = self._root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return False
+        return _END in node
+
+    def __len__(self):
+        return self._size
+
+
+def _discover_modules():
+    names = set(sys.builtin_module_names)
+    names.update(module.name for module in pkgutil.iter_modules())
+    return names
+
+
+class Completer:
+    """Completes names from a namespace, builtins, attributes and module names.
+
+    The names are kept in a prefix trie, which is brought up to date with just the
+    names that have been added to or removed from the namespace since the last
+    completion. Attribute names are cached per type. Importable modules are found
+    on a background thread, until it has finished the modules that have been
+    imported are completed.
+    """
+
+    def __init__(self, namespace):
+        self._namespace = namespace
+        self._indexed = set()
+        self._names = PrefixTrie(keyword.kwlist)
+        self._builtins = PrefixTrie(dir(builtins))
+        self._attributes = weakref.WeakKeyDictionary()
+        self._modules = None
+        self._discovery = threading.Thread(target=self._discover,
+                                           name='turm-module-discovery',
+                                           daemon=True)
+        self._discovery.start()
+
+    def _discover(self):
+        # Swapped in whole once it's complete, so it's never seen half built.
+        self._modules = PrefixTrie(_discover_modules())
+
+    def wait_for_modules(self, timeout=None):
+        self._discovery.join(timeout)
+        return self._modules is not None
+
+    def _sync_names(self):
+        names = set(self._namespace)
+        if names == self._indexed:
+            return
+        for name in self._indexed - names:
+            self._names.discard(name)
+        for name in names - self._indexed:
+            self._names.add(name)
+        self._indexed = names
+
+    def _type_attributes(self, cls):
+        attributes = self._attributes.get(cls)
+        if attributes is None:
+            attributes = self._attributes[cls] = PrefixTrie(dir(cls))
+        return attributes
+
+    def _complete_attribute(self, word):
+        path, _, prefix = word.rpartition('.')
+        names = path.split('.')
+        try:
+            if names[0] in self._namespace:
+                obj = self._namespace[names[0]]
+            else:
+                obj = getattr(builtins, names[0])
+            for name in names[1:]:
+                obj = getattr(obj, name)
+        except Exception:
+            return []
+
+        # Classes get their own entry, instances share their type's. Modules and
+        # instance dictionaries change too often to be cached.
+        if isinstance(obj, type):
+            candidates = self._type_attributes(obj).with_prefix(prefix)
+        else:
+            candidates = self._type_attributes(type(obj)).with_prefix(prefix)
+            instance_names = getattr(obj, '__dict__', None)
+            if isinstance(instance_names, dict):
+                candidates = sorted(
+                    set(candidates).union(name for name in instance_names
+                                          if name.startswith(prefix)))
+        return [path + '.' + name for name in candidates]
+
+    def _complete_module(self, word):
+        package, _, prefix = word.rpartition('.')
+        if package:
+            paths = getattr(sys.modules.get(package), '__path__', None)
+            if paths is None and '.' not in package:
+                # Finding a top level package doesn't import it.
+                try:
+                    spec = importlib.util.find_spec(package)
+                except (ImportError, ValueError):
+                    spec = None
+                paths = spec and spec.submodule_search_locations
+            if not paths:
+                return []
+            return sorted(package + '.' + info.name
+                          for info in pkgutil.iter_modules(paths)
+                          if info.name.startswith(prefix))
+        if self._modules is not None:
+            return self._modules.with_prefix(prefix)
+        return sorted(name for name in sys.modules
+                      if '.' not in name and name.startswith(prefix))
+
+    def complete(self, line):
+        """Return where the word before the end of `line` starts and its completions"""
+        word = _WORD.search(line).group()
+        start = len(line) - len(word)
+        if _IMPORT.match(line):
+            candidates = self._complete_module(word)
+        elif '.' in word:
+            candidates = self._complete_attribute(word)
+        else:
+            self._sync_names()
+            candidates = sorted(
+                set(self._names.with_prefix(word)).union(
+                    self._builtins.with_prefix(word)))
+
+        # Private names are only completed when asked for.
+        last = word.rpartition('.')[2]
+        if not last.startswith('_'):
+            candidates = [
+                name for name in candidates
+                if not name.rpartition('.')[2].startswith('_')
+            ]
+        return start, candidates
@@ -4,165 +4,293 @@ import termios
 import os
 import turm.escape_codes as escape_codes
 from turm.text_editor import TextEditor
-from turm.terminal import Term
+from turm.highlighting import Highlighter
+from turm.prompts import Prompts
+from turm.terminal import Term, TermWriter
 from dataclasses import dataclass
 
 @dataclass
-class RowColumn:
-    row: int = 0
-    column: int = 0
+class Viewport:
+    """Where the edit field is on the screen
+
+    `top_row` is the first row of text that is visible, it's drawn on the screen at
+    `screen_row`. Rows above it have scrolled off the top of the screen.
+    """
+    screen_row: int = 1
+    column: int = 1
+    top_row: int = 0
+
+    def screen_row_of(self, row):
+        return self.screen_row + row - self.top_row
+
+    def scroll_to(self, origin):
+        """Move the field so that its first row would be on screen row `origin`"""
+        self.screen_row = max(origin, 1)
+        self.top_row = self.screen_row - origin
 
 
 class EditField:
+    """Edits source at the terminal, with `highlight` set it's syntax highlighted"""
 
     def __init__(self,
                  ps1='>>> ',
                  ps2='... ',
                  istream=sys.stdin,
-                 ostream=sys.stdout):
-        self.ps1 = ps1
-        self.ps2 = ps2
-        self._prompts = [ps1]
+                 ostream=sys.stdout,
+                 binary=False,
+                 highlight=False):
+        self._prompts = Prompts(ps1, ps2)
+        self._highlighter = Highlighter() if highlight else None
         self._text = TextEditor()
-        self._term = Term(istream, ostream)
-        self._term_offset = RowColumn(row=self._term.row,
-                                      column=self._term.column)
+        self._term = Term(istream, ostream, binary=binary)
+        # A stream for output between prompts, e.g. to redirect sys.stdout to.
+        self.output = TermWriter(self._term)
+        self._start()
+
+    @property
+    def ps1(self):
+        return self._prompts.ps1
+
+    @ps1.setter
+    def ps1(self, prompt):
+        self._prompts.ps1 = prompt
+
+    @property
+    def ps2(self):
+        return self._prompts.ps2
+
+    @ps2.setter
+    def ps2(self, prompt):
+        self._prompts.ps2 = prompt
+
+    def _start(self):
+        self._prompts.clear()
+        if self._highlighter is not None:
+            self._highlighter.clear()
+        self._viewport = Viewport(screen_row=self._term.row,
+                                  column=self._term.column)
 
         self._term.write(self.ps1)
         self._term.flush()
+        self._drawn_lines = 1
+
+    def reset(self, query_cursor=False):
+        """Start again with an empty field at the cursor, reusing the terminal
+
+        Set `query_cursor` if there may have been output that didn't go through
+        `output`, e.g. from a subprocess, so the cursor is wherever that left it.
+        """
+        self.output.flush()
+        self._text.clear()
+        self._term.reset(query_cursor)
+        self._start()
+
+    def write_output(self, text):
+        """Write output at the cursor, e.g. the newline after the source is entered"""
+        self.output.write(text)
+        self.output.flush()
 
     def move_cursor_left(self, amount=1):
         assert amount > 0
         self._text.move_left(amount)
-        self._reset_cursor_position()
         self._redraw()
 
     def move_cursor_right(self, amount=1):
         assert amount > 0
         self._text.move_right(amount)
-        self._reset_cursor_position()
         self._redraw()
 
     def move_cursor_up(self, amount=1):
         assert amount > 0
         self._text.move_up(amount)
-        self._reset_cursor_position()
         self._redraw()
 
     def move_cursor_down(self, amount=1):
         assert amount > 0
         self._text.move_down(amount)
-        self._reset_cursor_position()
         self._redraw()
 
-    def _reset_cursor_position(self):
+    def on_first_row(self):
+        return self._text.get_row_and_column()[0] == 0
+
+    def on_last_row(self):
+        return self._text.get_row_and_column()[0] == self._text.line_count() - 1
+
+    @property
+    def screen_width(self):
+        return self._term.screen_width
+
+    @property
+    def screen_height(self):
+        return self._term.screen_height
+
+    def line_before_cursor(self):
         row, column = self._text.get_row_and_column()
-        column += len(self._prompts[row])
-        self._term.move_cursor_to(row + self._term_offset.row,
-                                  column + self._term_offset.column)
+        return self._text.get_line(row)[:column]
+
+    def show_below(self, text):
+        """Write text below the field, then draw the field again after it"""
+        source = str(self._text)
+        index = self._text.get_cursor_index()
+        self.move_cursor_to_end()
+        self.write_output('\n' + text)
+        self.reset()
+        self._text.insert_text(source)
+        self._text.move_left(len(source) - index)
+        self._redraw()
 
-    def _redraw_line(self, row=None):
-        if row is None:
-            self._term.move_cursor_to(None, self._term_offset.column)
+    def set_text(self, text):
+        """Replace all of the text, leaving the cursor at the end"""
+        assert all(0x20 <= ord(char) <= 0x7e or char == '\n' for char in text)
+        self._text.delete_range(0, len(self._text))
+        self._text.insert_text(text)
+        self._redraw(redraw_all=True)
+
+    def set_prompt(self, row, prompt=None):
+        """Give `row` its own prompt, or its default one back if `prompt` is None"""
+        if prompt is None:
+            del self._prompts[row]
         else:
-            self._term.move_cursor_to(row + self._term_offset.row,
-                                      self._term_offset.column)
-
-        self._term.erase_line()
+            self._prompts[row] = prompt
+        self._redraw(redraw_all=True)
 
-        if row is None:
-            row, _ = self._text.get_row_and_column()
+    def move_cursor_to_end(self):
+        self._text.move_right(len(self._text))
+        self._redraw()
 
-        prompt = self._prompts[row]
-        self._term.write(prompt)
+    def _reset_cursor_position(self):
+        row, column = self._text.get_row_and_column()
+        column += len(self._prompts[row])
+        self._term.move_cursor_to(self._viewport.screen_row_of(row),
+                                  column + self._viewport.column)
 
+    def _line_text(self, row):
         line = self._text.get_line(row)
         if line.endswith('\n'):
             line = line[:-1]
+        return line
 
-        self._term.write(line)
-        self._reset_cursor_position()
-        self._term.flush()
+    def _draw_line(self, row):
+        self._term.move_cursor_to(self._viewport.screen_row_of(row),
+                                  self._viewport.column)
+        self._term.erase_line()
+        self._term.write(self._prompts[row])
+        line = self._line_text(row)
+        if self._highlighter is None:
+            self._term.write(line)
+            return
+
+        column = 0
+        for start, end, attribute in self._highlighter.spans(
+                row, self._line_text):
+            self._term.write(line[column:start])
+            self._term.write(line[start:end], attribute)
+            column = end
+        self._term.write(line[column:])
+
+    def _erase_line(self, row):
+        self._term.move_cursor_to(self._viewport.screen_row_of(row), 1)
+        self._term.erase_line()
 
-    def _clear(self):
-        for i in range(len(self._prompts)):
-            term_line = self._term_offset.row + i
-            if term_line > self._term.screen_height:
-                break
-            else:
-                self._term.move_cursor_to(term_line, 1)
-                self._term.erase_line()
-        self._reset_cursor_position()
+    def visible_rows(self):
+        """The rows of text that fit on the screen"""
+        viewport = self._viewport
+        bottom = viewport.top_row + self._term.screen_height - viewport.screen_row
+        return range(viewport.top_row, bottom + 1)
 
-    def _redraw(self):
-        # expand the edit field `window` if there are more lines to print than the number of rows allows
-        if self._term_offset.row > 1:
-            num_lines = len(self._prompts)
-            term_lines = self._term.screen_height - (self._term_offset.row - 1)
-            if term_lines < num_lines:
-                self._term_offset.row -= 1
+    def _scroll_viewport(self):
+        viewport = self._viewport
+        height = self._term.screen_height
+        num_lines = self._text.line_count()
 
-        # adjust the row offset so that the cursor always remains in the visible area
-        row, column = self._text.get_row_and_column()
-        if self._term_offset.row + row > self._term.screen_height:
-            self._term_offset.row = self._term.screen_height - row
-        elif self._term_offset.row + row < 1:
-            self._term_offset.row = 1 - row
-
-        # draw all the lines
-        for i, (prompt,
-                line) in enumerate(zip(self._prompts,
-                                       self._text.iter_lines())):
-            term_line = self._term_offset.row + i
-            # skip lines that would draw off the top of the screen
-            if term_line < 1:
-                continue
-            # break when lines would start to be drawn below the screen
-            if term_line > self._term.screen_height:
-                break
+        # expand the edit field up the screen if its lines don't fit below it
+        rows_below = height - viewport.screen_row + 1
+        if viewport.screen_row > 1 and rows_below < num_lines:
+            viewport.screen_row -= 1
+
+        # scroll so that the cursor always remains in the visible area
+        row, _ = self._text.get_row_and_column()
+        origin = viewport.screen_row - viewport.top_row
+        if origin + row > height:
+            viewport.scroll_to(height - row)
+        elif origin + row < 1:
+            viewport.scroll_to(1 - row)
+
+    def _redraw(self, redraw_all=False):
+        previous_viewport = (self._viewport.screen_row, self._viewport.top_row)
+        self._scroll_viewport()
+
+        # Only the changed rows are drawn unless the field scrolled, which moves every row.
+        damage = self._text.take_damage()
+        if damage is not None and self._highlighter is not None:
+            # An edit can change the colours of the rows after it, e.g. by opening
+            # a string, those that are visible are drawn again too.
+            first, last = damage
+            stop = min(self._text.line_count(), self.visible_rows().stop)
+            changed = self._highlighter.update(first, last, stop,
+                                               self._line_text)
+            if last is not None and changed is not None and changed > last:
+                damage = (first, changed)
+        if redraw_all or (self._viewport.screen_row,
+                          self._viewport.top_row) != previous_viewport:
+            damage = (0, None)
+
+        if damage is not None:
+            first, last = damage
+            num_lines = self._text.line_count()
+            drawn_lines = self._drawn_lines
+            if last is None:
+                last = max(num_lines, drawn_lines) - 1
+
+            # Only the visible slice of the damaged rows is drawn, however many
+            # rows of text there are.
+            visible = self.visible_rows()
+            for i in range(max(first, visible.start),
+                           min(last + 1, visible.stop)):
+                if i < num_lines:
+                    self._draw_line(i)
+                elif i < drawn_lines:
+                    # clear rows left over from lines that have been removed
+                    self._erase_line(i)
+            self._drawn_lines = num_lines
 
-            self._term.move_cursor_to(term_line, self._term_offset.column)
-            self._term.erase_line()
-            self._term.write(prompt)
-            if line.endswith('\n'):
-                line = line[:-1]
-            self._term.write(line)
         self._reset_cursor_position()
+        self._term.flush()
 
     def insert(self, char):
         assert 0x20 <= ord(char) <= 0x7e
         self._text.insert(char)
-        # self._redraw_line()
+        self._redraw()
+
+    def insert_text(self, text):
+        """Insert a block of text, such as a paste, and redraw once"""
+        assert all(0x20 <= ord(char) <= 0x7e or char == '\n' for char in text)
+        row, _ = self._text.get_row_and_column()
+        self._text.insert_text(text)
+        self._prompts.insert_rows(row + 1, text.count('\n'))
+        if self._highlighter is not None:
+            self._highlighter.insert_rows(row + 1, text.count('\n'))
         self._redraw()
 
     def backspace(self):
         self._text.move_left(1)
         char = self._text.pop()
         if char == '\n':
-            self._clear()
             row, _ = self._text.get_row_and_column()
-            self._prompts.pop(row + 1)
+            self._prompts.delete_rows(row + 1)
+            if self._highlighter is not None:
+                self._highlighter.delete_rows(row + 1)
 
-        # self._redraw_line()
         self._redraw()
 
     def newline(self):
         self._text.insert('\n')
         row, _ = self._text.get_row_and_column()
 
-        # insert a new prompt for the newline
-        self._prompts.insert(row, self.ps2)
-
-        # write out enough newlines to display the rest of the lines
-        # TODO this breaks given enough lines.
-        # When trying to move_up past the top of the window, nothing happens and _redraw_line draws over the last line.
-        # When trying to move_down past the bottom the same thing happens. We knew that already but didn't factor in actually moving down, not adding newlines.
-        # self._term.write('\n' * (len(self._prompts) - row))
-        # self._term.flush()
-        # # Starting from the line the newline was added to, redraw every line going down.
-        # for i in range(row - 1, len(self._prompts)):
-        #     self._redraw_line(i)
-        # self._reset_cursor_position()
+        # the new row gets the default prompt
+        self._prompts.insert_rows(row)
+        if self._highlighter is not None:
+            self._highlighter.insert_rows(row)
         self._redraw()
 
     def __str__(self):
@@ -1,77 +1,114 @@
-import inspect
-
-
-def _snake_to_camel_case(name):
-    return ''.join(x.capitalize() for x in name.split('_'))
-
-
-def _self_parameter():
-    return inspect.Parameter('self',
-                             kind=inspect.Parameter.POSITIONAL_OR_KEYWORD)
-
-
-def _escape_code(str_func):
-    name = _snake_to_camel_case(str_func.__name__)
-
-    sig = inspect.signature(str_func)
-
-    init_params = [_self_parameter()]
-    init_params.extend(sig.parameters.values())
-    init_sig = str(inspect.Signature(init_params))
-
-    indent = ' ' * 8
-    assignments = [f'{indent}self.{x} = {x}' for x in sig.parameters.keys()]
-    if assignments:
-        assignments = '\n'.join(assignments)
-    else:
-        assignments = f'{indent}pass'
-
-    str_args = [f'self.{x}' for x in sig.parameters.keys()]
-    str_args = ', '.join(str_args)
-
-    repr_args = [f'{x}={{self.{x}}}' for x in sig.parameters.keys()]
-    repr_args = ', '.join(repr_args)
-
-    exec_str = f"""
-class {name}:
-    def __init__{init_sig}:
-{assignments}
+import functools
+import re
+import types
+
+# Codes without parameters are constants, so they cost nothing to encode.
+ENABLE_BRACKETED_PASTE = '\x1b[?2004h'
+DISABLE_BRACKETED_PASTE = '\x1b[?2004l'
+BRACKETED_PASTE_START = '\x1b[200~'
+BRACKETED_PASTE_END = '\x1b[201~'
+ERASE_FROM_CURSOR_TO_END_OF_LINE = '\x1b[0K'
+ERASE_LINE = '\x1b[2K'
+REQUEST_CURSOR_POSITION = '\x1b[6n'
+RESET_ATTRIBUTES = '\x1b[0m'
+
+# Parameters of `select_graphic_rendition` for the foreground colours, the bright
+# ones are BRIGHT + a colour.
+BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(30, 38)
+BRIGHT = 60
+
+
+class EscapeCode:
+    """Base class of the escape code classes.
+
+    Code classes are made by `_code_class` from the table below. Instances are
+    immutable and hashable, compare equal when they are the same code with the same
+    values, and `str` gives the escape sequence for the code.
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _defaults = {}
+
+    def __init__(self, *args, **kwargs):
+        cls = type(self)
+        if len(args) > len(self._fields):
+            raise TypeError(f'{cls.__name__}() takes {len(self._fields)} '
+                            f'arguments but {len(args)} were given')
+        values = dict(zip(self._fields, args))
+        for name, value in kwargs.items():
+            if name not in self._fields or name in values:
+                raise TypeError(
+                    f'{cls.__name__}() got an unexpected argument {name!r}')
+            values[name] = value
+
+        for name in self._fields:
+            if name in values:
+                value = values[name]
+            elif name in self._defaults:
+                value = self._defaults[name]
+            else:
+                raise TypeError(
+                    f'{cls.__name__}() missing argument {name!r}')
+            object.__setattr__(self, name, value)
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash((type(self), self._values()))
 
     def __str__(self):
-        return {str_func.__name__}({str_args})
+        return self._encode(*self._values())
 
     def __repr__(self):
-        return f"{name}({repr_args})"
-"""
+        values = ', '.join(f'{name}={value}'
+                           for name, value in zip(self._fields, self._values()))
+        return f'{type(self).__name__}({values})'
 
-    exec_locals = {}
-    exec(exec_str, locals=exec_locals)
-    globals()[f'{name}'] = exec_locals[f'{name}']
-    return str_func
+
+def _code_class(name, encode, *fields, **defaults):
+    """Make the class for a code, `fields` are required and `defaults` optional"""
+    fields = fields + tuple(defaults)
+    return type(
+        name, (EscapeCode, ), {
+            '__slots__': fields,
+            '__match_args__': fields,
+            '_fields': fields,
+            '_defaults': defaults,
+            '_encode': staticmethod(encode),
+        })
 
 
-@_escape_code
 def enable_bracketed_paste():
     """Write to stdout to enable bracketed paste for this application"""
-    return "\x1b[?2004h"
+    return ENABLE_BRACKETED_PASTE
 
 
-@_escape_code
 def disable_bracketed_paste():
     """Write to stdout to enable bracketed paste for this application"""
-    return "\x1b[?2004l"
+    return DISABLE_BRACKETED_PASTE
 
 
-@_escape_code
 def bracketed_paste_start():
     """When read from stdin this marks the start of a bracketed paste input"""
-    return "\x1b[200~"
+    return BRACKETED_PASTE_START
 
 
-@_escape_code
 def bracketed_paste_end():
     """When read from stdin this marks the end of a bracketed paste input"""
-    return "\x1b[201~"
+    return BRACKETED_PASTE_END
 
 
 def _move_cursor(direction_code, amount):
@@ -84,151 +121,292 @@ def _move_cursor(direction_code, amount):
         return f'\x1b[{amount}{direction_code}'
 
 
-@_escape_code
+# Codes with parameters are cached. Redraws keep encoding moves to the same
+# positions on the screen, so the caches are large enough to hold one for every
+# cell of a typical terminal.
+@functools.lru_cache(maxsize=256)
 def move_cursor_left(amount=1):
     return _move_cursor('D', amount)
 
 
-@_escape_code
+@functools.lru_cache(maxsize=256)
 def move_cursor_right(amount=1):
     return _move_cursor('C', amount)
 
 
-@_escape_code
+@functools.lru_cache(maxsize=256)
 def move_cursor_up(amount=1):
     return _move_cursor('A', amount)
 
 
-@_escape_code
+@functools.lru_cache(maxsize=256)
 def move_cursor_down(amount=1):
     return _move_cursor('B', amount)
 
 
-@_escape_code
 def erase_from_cursor_to_end_of_line():
-    return '\x1b[0K'
+    return ERASE_FROM_CURSOR_TO_END_OF_LINE
 
 
-@_escape_code
 def erase_line():
-    return '\x1b[2K'
+    return ERASE_LINE
 
 
-@_escape_code
+@functools.lru_cache(maxsize=512)
 def move_cursor_to_column(column):
     assert column >= 0
     return f'\x1b[{column}G'
 
 
-@_escape_code
+@functools.lru_cache(maxsize=16384)
 def move_cursor_to(row, column):
     return f'\x1b[{row};{column}H'
 
 
-@_escape_code
 def request_cursor_position():
-    return '\x1b[6n'
+    return REQUEST_CURSOR_POSITION
 
 
-@_escape_code
 def reported_cursor_position(row, column):
     return f'\x1b[{row};{column}R'
 
 
-def _parse_int(chars, start):
-    int_str = chars[start]
-    i = start + 1
-    while i < len(chars) and ('0' <= chars[i] <= '9'):
-        int_str += chars[i]
-        i += 1
-    return int(chars[start:i]), i
+def reset_attributes():
+    return RESET_ATTRIBUTES
+
+
+@functools.lru_cache(maxsize=256)
+def select_graphic_rendition(*parameters):
+    """Set how the following text is drawn, e.g. its colour"""
+    return f'\x1b[{";".join(map(str, parameters))}m'
+
+
+EnableBracketedPaste = _code_class('EnableBracketedPaste',
+                                   enable_bracketed_paste)
+DisableBracketedPaste = _code_class('DisableBracketedPaste',
+                                    disable_bracketed_paste)
+BracketedPasteStart = _code_class('BracketedPasteStart', bracketed_paste_start)
+BracketedPasteEnd = _code_class('BracketedPasteEnd', bracketed_paste_end)
+MoveCursorLeft = _code_class('MoveCursorLeft', move_cursor_left, amount=1)
+MoveCursorRight = _code_class('MoveCursorRight', move_cursor_right, amount=1)
+MoveCursorUp = _code_class('MoveCursorUp', move_cursor_up, amount=1)
+MoveCursorDown = _code_class('MoveCursorDown', move_cursor_down, amount=1)
+EraseFromCursorToEndOfLine = _code_class('EraseFromCursorToEndOfLine',
+                                         erase_from_cursor_to_end_of_line)
+EraseLine = _code_class('EraseLine', erase_line)
+MoveCursorToColumn = _code_class('MoveCursorToColumn', move_cursor_to_column,
+                                 'column')
+MoveCursorTo = _code_class('MoveCursorTo', move_cursor_to, 'row', 'column')
+RequestCursorPosition = _code_class('RequestCursorPosition',
+                                    request_cursor_position)
+ReportedCursorPosition = _code_class('ReportedCursorPosition',
+                                     reported_cursor_position, 'row', 'column')
+SelectGraphicRendition = _code_class('SelectGraphicRendition',
+                                     select_graphic_rendition,
+                                     parameter=0)
+
+
+def _bytes_encoder(encode, maxsize):
+
+    @functools.lru_cache(maxsize=maxsize)
+    def encode_bytes(*args):
+        return encode(*args).encode('ascii')
+
+    return encode_bytes
+
+
+# The codes as bytes, for writing to binary streams without encoding each code.
+b = types.SimpleNamespace(
+    ENABLE_BRACKETED_PASTE=ENABLE_BRACKETED_PASTE.encode('ascii'),
+    DISABLE_BRACKETED_PASTE=DISABLE_BRACKETED_PASTE.encode('ascii'),
+    BRACKETED_PASTE_START=BRACKETED_PASTE_START.encode('ascii'),
+    BRACKETED_PASTE_END=BRACKETED_PASTE_END.encode('ascii'),
+    ERASE_FROM_CURSOR_TO_END_OF_LINE=ERASE_FROM_CURSOR_TO_END_OF_LINE.encode(
+        'ascii'),
+    ERASE_LINE=ERASE_LINE.encode('ascii'),
+    REQUEST_CURSOR_POSITION=REQUEST_CURSOR_POSITION.encode('ascii'),
+    RESET_ATTRIBUTES=RESET_ATTRIBUTES.encode('ascii'),
+    move_cursor_left=_bytes_encoder(move_cursor_left, 256),
+    move_cursor_right=_bytes_encoder(move_cursor_right, 256),
+    move_cursor_up=_bytes_encoder(move_cursor_up, 256),
+    move_cursor_down=_bytes_encoder(move_cursor_down, 256),
+    move_cursor_to_column=_bytes_encoder(move_cursor_to_column, 512),
+    move_cursor_to=_bytes_encoder(move_cursor_to, 16384),
+    reported_cursor_position=_bytes_encoder(reported_cursor_position, 256),
+    select_graphic_rendition=_bytes_encoder(select_graphic_rendition, 256),
+)
 
 
 def _unrecognized_sequence_exception(chars):
-    return Exception('unrecognised sequence {chars.encode("utf-8")}')
-
-
-def _parse_csi_with_two_values(chars, i, value_1):
-    assert '0' <= chars[i] <= '9'
-    value_2, i = _parse_int(chars, i)
-
-    match chars[i]:
-        case 'H':
-            return MoveCursorTo(row=value_1, column=value_2)
-        case 'R':
-            return ReportedCursorPosition(row=value_1, column=value_2)
-        case _:
-            raise _unrecognized_sequence_exception(chars)
-
-
-def _parse_csi_with_value(chars, i):
-    value_1, i = _parse_int(chars, i)
-
-    match value_1, chars[i]:
-        case _, 'A':
-            return MoveCursorUp(amount=value_1)
-        case _, 'B':
-            return MoveCursorDown(amount=value_1)
-        case _, 'C':
-            return MoveCursorRight(amount=value_1)
-        case _, 'D':
-            return MoveCursorLeft(amount=value_1)
-        case _, 'G':
-            return MoveCursorToColumn(column=value_1)
-        case 6, 'n':
-            return RequestCursorPosition()
-        case 0, 'K':
-            return EraseFromCursorToEndOfLine()
-        case 2, 'K':
-            return EraseLine()
-        case 200, '~':
-            return BracketedPasteStart()
-        case 201, '~':
-            return BracketedPasteEnd()
-        case _, ';':
-            return _parse_csi_with_two_values(chars, i + 1, value_1)
-        case _:
-            raise _unrecognized_sequence_exception(chars)
-
-
-def _parse_bracketed_paste_command(chars, i):
-    value, i = _parse_int(chars, i)
-    match value, chars[i]:
-        case 2004, 'h':
-            return EnableBracketedPaste()
-        case 2004, 'l':
-            return DisableBracketedPaste()
-        case _:
-            raise _unrecognized_sequence_exception(chars)
-
-
-def _parse_csi_command(chars):
-    i = 2
-    match chars[i]:
-        case 'A':
-            return MoveCursorUp()
-        case 'B':
-            return MoveCursorDown()
-        case 'C':
-            return MoveCursorRight()
-        case 'D':
-            return MoveCursorLeft()
-        case '?':
-            return _parse_bracketed_paste_command(chars, i + 1)
-        case _ if chars[i].isdigit():
-            return _parse_csi_with_value(chars, i)
-        case _:
-            raise _unrecognized_sequence_exception(chars)
-
+    return Exception(f'unrecognised sequence {chars.encode("utf-8")}')
+
+
+# CSI codes that are only recognised with particular parameters.
+_CSI_CONSTANTS = {
+    ('', (), 'K'): EraseFromCursorToEndOfLine,
+    ('', (0, ), 'K'): EraseFromCursorToEndOfLine,
+    ('', (2, ), 'K'): EraseLine,
+    ('', (6, ), 'n'): RequestCursorPosition,
+    ('', (200, ), '~'): BracketedPasteStart,
+    ('', (201, ), '~'): BracketedPasteEnd,
+    ('?', (2004, ), 'h'): EnableBracketedPaste,
+    ('?', (2004, ), 'l'): DisableBracketedPaste,
+}
+
+# CSI codes whose parameters are passed to the code class.
+_CSI_FUNCTIONS = {
+    ('', 'A'): MoveCursorUp,
+    ('', 'B'): MoveCursorDown,
+    ('', 'C'): MoveCursorRight,
+    ('', 'D'): MoveCursorLeft,
+    ('', 'G'): MoveCursorToColumn,
+    ('', 'H'): MoveCursorTo,
+    ('', 'R'): ReportedCursorPosition,
+    ('', 'm'): SelectGraphicRendition,
+}
+
+# The finals of CSI codes whose parameters count from 1, as a VT terminal does they
+# take 0 to mean the default of 1.
+_ONE_BASED = frozenset('ABCDGHR')
+
+# Codes sent as SS3 sequences, e.g. the arrow keys in application cursor mode.
+_SS3_CODES = {
+    'A': MoveCursorUp,
+    'B': MoveCursorDown,
+    'C': MoveCursorRight,
+    'D': MoveCursorLeft,
+}
+
+
+def _dispatch_csi(parameters, final):
+    private = ''
+    if parameters and parameters[0] in '<=>?':
+        private = parameters[0]
+        parameters = parameters[1:]
 
-def parse_escape_code(chars):
     try:
-        assert chars[0] == '\x1b'
+        values = tuple(int(x) if x else 1 for x in parameters.split(';'))
+    except ValueError:
+        return None  # sub-parameters, which none of our codes use
+    if not parameters:
+        values = ()
+    elif not private and final in _ONE_BASED:
+        values = tuple(value or 1 for value in values)
+
+    code_class = _CSI_CONSTANTS.get((private, values, final))
+    if code_class is not None:
+        return code_class()
+
+    code_class = _CSI_FUNCTIONS.get((private, final))
+    if code_class is not None:
+        try:
+            return code_class(*values)
+        except TypeError:
+            return None  # wrong number of parameters
+    return None
+
+
+_TEXT = re.compile(r'[^\x00-\x1f\x7f]+')
+
+
+class Tokenizer:
+    """A resumable parser that splits input into text and escape codes.
+
+    It is a state machine following the VT500 series parser, so input can be fed in
+    chunks of any size and escape codes split between chunks are still recognised.
+    """
+
+    _GROUND = 0
+    _ESCAPE = 1
+    _CSI_PARAM = 2
+    _CSI_INTERMEDIATE = 3
+    _CSI_IGNORE = 4
+    _SS3 = 5
+
+    def __init__(self):
+        self._state = self._GROUND
+        self._parameters = []
+
+    def in_sequence(self):
+        """True if the input so far ends part way through an escape sequence"""
+        return self._state != self._GROUND
+
+    def feed(self, chars):
+        """Yield the text and escape codes in `chars`
+
+        Runs of printable text are yielded as strings and each control character is
+        yielded as a string of its own. Escape codes are yielded as code objects,
+        sequences that aren't recognised are skipped.
+        """
+        i = 0
+        length = len(chars)
+        while i < length:
+            state = self._state
+            char = chars[i]
+
+            if state == self._GROUND:
+                if match := _TEXT.match(chars, i):
+                    yield match.group()
+                    i = match.end()
+                    continue
+                if char == '\x1b':
+                    self._state = self._ESCAPE
+                else:
+                    yield char
+
+            elif char < ' ' or char == '\x7f':
+                # Control characters are executed in the middle of a sequence and
+                # an escape starts a new one.
+                if char == '\x1b':
+                    self._state = self._ESCAPE
+                elif char != '\x7f':
+                    yield char
+
+            elif state == self._ESCAPE:
+                match char:
+                    case '[':
+                        self._state = self._CSI_PARAM
+                        self._parameters.clear()
+                    case 'O':
+                        self._state = self._SS3
+                    case _:
+                        self._state = self._GROUND
+
+            elif state == self._SS3:
+                self._state = self._GROUND
+                if char in _SS3_CODES:
+                    yield _SS3_CODES[char]()
+
+            elif '@' <= char <= '~':
+                self._state = self._GROUND
+                if state == self._CSI_PARAM:
+                    code = _dispatch_csi(''.join(self._parameters), char)
+                    if code is not None:
+                        yield code
+
+            elif char <= '/':
+                if state == self._CSI_PARAM:
+                    self._state = self._CSI_INTERMEDIATE
+
+            elif state == self._CSI_PARAM:
+                self._parameters.append(char)
+
+            else:
+                self._state = self._CSI_IGNORE
+
+            i += 1
 
-        if chars[1] == '[':
-            return _parse_csi_command(chars)
-        else:
-            raise _unrecognized_sequence_exception(chars)
 
-    except IndexError:
+def parse_escape_code(chars):
+    """Parse a single escape code, returning None if `chars` is incomplete"""
+    if not chars:
+        return None
+    assert chars[0] == '\x1b'
+
+    tokenizer = Tokenizer()
+    tokens = list(tokenizer.feed(chars))
+    if tokenizer.in_sequence():
         return None  # incomplete sequence
+    if len(tokens) == 1 and not isinstance(tokens[0], str):
+        return tokens[0]
+    raise _unrecognized_sequence_exception(chars)
@@ -0,0 +1,315 @@
+import codecs
+import collections
+import ctypes
+import functools
+import marshal
+import os
+import queue
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import turm.process_worker as process_worker
+
+
+class Job:
+    """A function submitted to an executor and how it ended"""
+
+    def __init__(self, function):
+        self._function = function
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self.exception = None
+
+    def run(self):
+        try:
+            self._function()
+        except BaseException as e:
+            self.exception = e
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            callback(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish, returning False if `timeout` passed first"""
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback):
+        """Call `callback` with the job when it finishes, in the thread running it"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+
+class InlineExecutor:
+    """Runs each job in the calling thread, it has finished by the time `submit` returns"""
+
+    threaded = False
+    isolated = False
+
+    def submit(self, function):
+        job = Job(function)
+        job.run()
+        return job
+
+    def interrupt(self):
+        return False
+
+    def shutdown(self):
+        pass
+
+
+def _set_async_exc(thread_id, exception):
+    return ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id),
+        None if exception is None else ctypes.py_object(exception))
+
+
+class ThreadExecutor:
+    """Runs jobs one at a time on a worker thread, the caller carries on meanwhile.
+
+    `interrupt` raises KeyboardInterrupt in the running job. Like ctrl-c in the
+    main thread it's raised between bytecodes, so a job blocked in a call that
+    doesn't return to Python isn't interrupted until the call returns.
+    """
+
+    threaded = True
+    isolated = False
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._job = None
+        self._job_thread_id = None
+        self._thread = None
+
+    def submit(self, function):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work,
+                                            name='turm-executor',
+                                            daemon=True)
+            self._thread.start()
+        job = Job(function)
+        self._jobs.put(job)
+        return job
+
+    def interrupt(self):
+        """Interrupt the running job, returning False if there isn't one"""
+        with self._lock:
+            if self._job is None:
+                return False
+            _set_async_exc(self._job_thread_id, KeyboardInterrupt)
+            return True
+
+    def _run(self, job):
+        with self._lock:
+            self._job = job
+            self._job_thread_id = threading.get_ident()
+        try:
+            job.run()
+        finally:
+            with self._lock:
+                self._job = None
+                # Drop an interrupt that came too late to be raised in the job.
+                _set_async_exc(self._job_thread_id, None)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except KeyboardInterrupt as e:
+                # The interrupt was raised after the function returned.
+                if not job.done():
+                    job.exception = e
+                    job._finish()
+
+    def shutdown(self, wait=True):
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
+
+
+class _Worker:
+    """A worker process and the pipes to it"""
+
+    def __init__(self):
+        request_read, self.request_fd = os.pipe()
+        self.status_fd, status_write = os.pipe()
+        # The worker has to be able to import turm however this process did.
+        turm_path = os.path.dirname(
+            os.path.dirname(os.path.abspath(process_worker.__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [turm_path, env.get('PYTHONPATH')]))
+        try:
+            self.process = subprocess.Popen(
+                [
+                    sys.executable, '-u', '-m', 'turm.process_worker',
+                    str(request_read),
+                    str(status_write)
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                pass_fds=(request_read, status_write),
+                env=env)
+        finally:
+            os.close(request_read)
+            os.close(status_write)
+        self.output_fd = self.process.stdout.fileno()
+
+    def send(self, code):
+        data = marshal.dumps(code)
+        data = memoryview(process_worker.HEADER.pack(len(data)) + data)
+        while data:
+            data = data[os.write(self.request_fd, data):]
+
+    def stop(self, timeout=1):
+        """End the process even if it's running code, killing it if it has to"""
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def close(self, timeout=1):
+        # An idle worker exits when its requests end, a busy one is stopped.
+        os.close(self.request_fd)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.stop(timeout)
+        os.close(self.status_fd)
+        self.process.stdout.close()
+
+
+class ProcessExecutor:
+    """Runs code in a worker process, so it can't block or crash this one.
+
+    Code has to be submitted compiled, with `submit_code`, and runs in the worker's
+    own namespace which lasts from one statement to the next. Its output is
+    streamed back to a text stream while it runs. Started worker processes are kept
+    spare, so if the worker crashes or exits a warm one takes over straight away.
+    `interrupt` sends the worker SIGINT.
+    """
+
+    threaded = True
+    isolated = True
+
+    def __init__(self, spares=1):
+        self._spares = collections.deque(_Worker() for _ in range(spares))
+        self._worker = _Worker()
+        self._lock = threading.Lock()
+        self._running = False
+        self._closed = False
+        # Waits for the results of the worker, one job at a time.
+        self._waiter = ThreadExecutor()
+
+    def submit_code(self, code, output):
+        """Run `code` in the worker, writing what it outputs to `output`"""
+        worker = self._worker
+        worker.send(code)
+        with self._lock:
+            self._running = True
+        return self._waiter.submit(functools.partial(self._wait, worker, output))
+
+    def interrupt(self):
+        with self._lock:
+            if not self._running:
+                return False
+            self._worker.process.send_signal(signal.SIGINT)
+            return True
+
+    def _read_status(self, worker, output, decoder):
+        # Output is streamed until the status arrives, None means the worker died.
+        status = b''
+        with selectors.DefaultSelector() as selector:
+            selector.register(worker.output_fd, selectors.EVENT_READ)
+            selector.register(worker.status_fd, selectors.EVENT_READ)
+            while len(status) < process_worker.STATUS.size:
+                for key, _ in selector.select():
+                    data = os.read(key.fd, 64 * 1024)
+                    if key.fd == worker.status_fd:
+                        if not data:
+                            return None
+                        status += data
+                    elif data:
+                        output.write(decoder.decode(data))
+                    else:
+                        selector.unregister(key.fd)
+        return status
+
+    def _wait(self, worker, output):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            status = self._read_status(worker, output, decoder)
+
+            # The worker flushes its output before it sends the status.
+            os.set_blocking(worker.output_fd, False)
+            try:
+                while data := os.read(worker.output_fd, 64 * 1024):
+                    output.write(decoder.decode(data))
+            except BlockingIOError:
+                pass
+            finally:
+                os.set_blocking(worker.output_fd, True)
+            output.write(decoder.decode(b'', final=True))
+        finally:
+            with self._lock:
+                self._running = False
+
+        if status is None and not self._closed:
+            code = worker.process.wait()
+            self._replace_worker()
+            output.write(f'worker process exited with code {code}, '
+                         'its variables are lost\n')
+        output.flush()
+
+        if status is not None:
+            kind, code = process_worker.STATUS.unpack(status)
+            if kind == b'X':
+                self._replace_worker()
+                raise SystemExit(code)
+
+    def _replace_worker(self):
+        if self._closed:
+            return  # the workers are closed by `shutdown`
+        self._worker.close()
+        if self._spares:
+            self._worker = self._spares.popleft()
+            self._spares.append(_Worker())
+        else:
+            self._worker = _Worker()
+
+    def shutdown(self):
+        """Stop the workers, including one that is still running code"""
+        with self._lock:
+            self._closed = True
+            running = self._running
+        if running:
+            # The job waiting for it ends when the worker does.
+            self._worker.stop()
+        self._waiter.shutdown()
+        for worker in [self._worker, *self._spares]:
+            worker.close()
+        self._spares.clear()
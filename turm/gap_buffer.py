@@ -0,0 +1,154 @@
+import itertools
+
+
+class GapBuffer:
+    """A list-like sequence of characters stored with a movable gap.
+
+    Insertions and deletions next to the previous edit are O(1) amortized, only
+    moving the gap costs time proportional to the distance moved. It supports the
+    subset of the list interface used by `TextEditor` so the two can be swapped.
+    """
+
+    def __init__(self, chars='', capacity=64):
+        self._buffer = list(chars)
+        self._gap_start = len(self._buffer)
+        self._buffer.extend([''] * capacity)
+        self._gap_end = len(self._buffer)
+
+    def _gap_size(self):
+        return self._gap_end - self._gap_start
+
+    def _move_gap(self, index):
+        if index < self._gap_start:
+            amount = self._gap_start - index
+            self._buffer[self._gap_end - amount:self._gap_end] = self._buffer[
+                index:self._gap_start]
+            self._gap_start -= amount
+            self._gap_end -= amount
+        elif index > self._gap_start:
+            amount = index - self._gap_start
+            self._buffer[self._gap_start:index] = self._buffer[
+                self._gap_end:self._gap_end + amount]
+            self._gap_start += amount
+            self._gap_end += amount
+
+    def _grow(self, amount):
+        # Double the storage so that repeated inserts are amortized O(1).
+        grow_by = max(amount, len(self._buffer))
+        self._buffer[self._gap_end:self._gap_end] = [''] * grow_by
+        self._gap_end += grow_by
+
+    def _slice_range(self, key):
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError('gap buffer slices must have a step of 1')
+        return start, max(start, stop)
+
+    def _physical_index(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('gap buffer index out of range')
+        if index >= self._gap_start:
+            index += self._gap_size()
+        return index
+
+    def insert(self, index, char):
+        index = min(max(index, 0), len(self))
+        self._move_gap(index)
+        if self._gap_start == self._gap_end:
+            self._grow(1)
+        self._buffer[self._gap_start] = char
+        self._gap_start += 1
+
+    def pop(self, index=-1):
+        physical_index = self._physical_index(index)
+        char = self._buffer[physical_index]
+        if index < 0:
+            index += len(self)
+        self._move_gap(index)
+        self._buffer[self._gap_end] = ''
+        self._gap_end += 1
+        return char
+
+    def insert_chars(self, index, chars):
+        index = min(max(index, 0), len(self))
+        self._move_gap(index)
+        if self._gap_size() < len(chars):
+            self._grow(len(chars))
+        self._buffer[self._gap_start:self._gap_start + len(chars)] = chars
+        self._gap_start += len(chars)
+
+    def delete_chars(self, start, stop):
+        self._move_gap(start)
+        amount = stop - start
+        self._buffer[self._gap_end:self._gap_end + amount] = [''] * amount
+        self._gap_end += amount
+
+    def index(self, value, start=0, stop=None):
+        length = len(self)
+        if stop is None or stop > length:
+            stop = length
+        start = max(start, 0)
+        gap_size = self._gap_size()
+
+        if start < self._gap_start:
+            try:
+                return self._buffer.index(value, start,
+                                          min(stop, self._gap_start))
+            except ValueError:
+                pass
+
+        start = max(start, self._gap_start)
+        if start < stop:
+            try:
+                return self._buffer.index(value, start + gap_size,
+                                          stop + gap_size) - gap_size
+            except ValueError:
+                pass
+
+        raise ValueError(f"'{value}' is not in buffer")
+
+    def __len__(self):
+        return len(self._buffer) - self._gap_size()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return list(self)[key]
+            stop = max(start, stop)
+            gap_size = self._gap_size()
+            if stop <= self._gap_start:
+                return self._buffer[start:stop]
+            elif start >= self._gap_start:
+                return self._buffer[start + gap_size:stop + gap_size]
+            else:
+                return (self._buffer[start:self._gap_start] +
+                        self._buffer[self._gap_end:stop + gap_size])
+        return self._buffer[self._physical_index(key)]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop = self._slice_range(key)
+            self.delete_chars(start, stop)
+            self.insert_chars(start, value)
+        else:
+            self._buffer[self._physical_index(key)] = value
+
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            self.delete_chars(*self._slice_range(key))
+        else:
+            self.pop(key)
+
+    def __iter__(self):
+        return itertools.chain(self._buffer[:self._gap_start],
+                               self._buffer[self._gap_end:])
+
+    def __str__(self):
+        return ''.join(self._buffer[:self._gap_start]) + ''.join(
+            self._buffer[self._gap_end:])
+
+    def __repr__(self):
+        return f'GapBuffer({str(self)!r})'
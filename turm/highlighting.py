@@ -0,0 +1,174 @@
+import builtins
+import keyword
+import re
+from dataclasses import dataclass
+import turm.escape_codes as escape_codes
+from turm.completeness import LineState
+
+# The attributes tokens are drawn with, `Term` attributes are graphic rendition
+# parameters.
+KEYWORD = escape_codes.MAGENTA
+BUILTIN = escape_codes.CYAN
+DEFINITION = escape_codes.BRIGHT + escape_codes.BLUE
+STRING = escape_codes.GREEN
+NUMBER = escape_codes.YELLOW
+COMMENT = escape_codes.BRIGHT + escape_codes.BLACK
+
+_KEYWORDS = frozenset(keyword.kwlist)
+_BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith('_'))
+
+_TOKEN = re.compile(r'''
+    (?P<comment>\#.*)
+    | (?P<string>(?:[rRbBuUfF]{1,2})?(?:\'\'\'|"""|\'|"))
+    | (?P<number>(?:0[xXoObB][\da-fA-F_]+|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)
+                  (?:[eE][+-]?\d+)?[jJ]?)\b)
+    | (?P<name>[^\W\d]\w*)
+    | (?P<bracket>[(\[{}\])])
+    ''', re.VERBOSE)
+
+
+def _string_end(text, index, quote):
+    """Return where the string that `index` is in ends, or None if it doesn't"""
+    while True:
+        end = text.find(quote, index)
+        escape = text.find('\\', index)
+        if escape == -1 or end == -1 or end < escape:
+            return None if end == -1 else end + len(quote)
+        index = escape + 2
+
+
+@dataclass(frozen=True, slots=True)
+class _Line:
+    text: str
+    start: LineState
+    end: LineState
+    spans: tuple
+
+
+def lex_line(text, start=LineState()):
+    """Return the highlighted spans of a line and the state at the end of it
+
+    The spans are (start, end, attribute) tuples. The state is what is still open
+    at the end of the line, as for `completeness.scan_line`.
+    """
+    spans = []
+    brackets = list(start.brackets)
+    string = start.string
+    index = 0
+    if string:
+        end = _string_end(text, 0, string)
+        spans.append((0, len(text) if end is None else end, STRING))
+        if end is None:
+            return spans, LineState(start.brackets, string)
+        string = None
+        index = end
+
+    definition = False
+    length = len(text)
+    while (token := _TOKEN.search(text, index)) is not None:
+        index = token.end()
+        match token.lastgroup:
+            case 'comment':
+                spans.append((token.start(), index, COMMENT))
+            case 'string':
+                quote = token.group().lstrip('rRbBuUfF')
+                end = _string_end(text, index, quote)
+                if end is None:
+                    # A triple quoted string goes on to the next line.
+                    end = length
+                    if len(quote) == 3:
+                        string = quote
+                spans.append((token.start(), end, STRING))
+                index = end
+            case 'number':
+                spans.append((token.start(), index, NUMBER))
+            case 'name':
+                name = token.group()
+                if definition:
+                    spans.append((token.start(), index, DEFINITION))
+                elif name in _KEYWORDS:
+                    spans.append((token.start(), index, KEYWORD))
+                elif name in _BUILTINS:
+                    spans.append((token.start(), index, BUILTIN))
+                definition = name in ('def', 'class')
+                continue
+            case 'bracket':
+                if token.group() in '([{':
+                    brackets.append(token.group())
+                elif brackets:
+                    brackets.pop()
+        definition = False
+
+    continued = (string is None and text.endswith('\\')
+                 and not (spans and spans[-1][1] == length))
+    return spans, LineState(''.join(brackets), string, continued)
+
+
+class Highlighter:
+    """Highlights Python source a line at a time.
+
+    The state the lexer was in at the start and end of each line is kept. After an
+    edit lines are lexed again from the first one that changed, and a line whose
+    text and starting state are the same as before keeps its spans, so once the
+    state at the end of the edited lines is what it was nothing after them is lexed.
+    Rows are inserted and deleted along with the text to keep lines in their rows.
+    """
+
+    def __init__(self):
+        self._lines = []
+        # The rows before this one are known to be up to date.
+        self._valid = 0
+
+    def clear(self):
+        self._lines.clear()
+        self._valid = 0
+
+    def insert_rows(self, row, count=1):
+        self._lines[row:row] = [None] * count
+        self._valid = min(self._valid, row)
+
+    def delete_rows(self, row, count=1):
+        del self._lines[row:row + count]
+        self._valid = min(self._valid, row)
+
+    def update(self, first, last, stop, get_line):
+        """Lex rows from `first` to `last` again, where the text has changed
+
+        The rows after them are lexed too until one starts in the same state as
+        before, as far as `stop`. `last` is None if every row from `first` may have
+        changed. Returns the last row whose spans changed, or None.
+        """
+        self._valid = min(self._valid, first)
+        changed = None
+        index = self._valid
+        while index < stop:
+            start = self._lines[index - 1].end if index else LineState()
+            text = get_line(index)
+            if index == len(self._lines):
+                self._lines.append(None)
+            line = self._lines[index]
+            if line is not None and line.text == text and line.start == start:
+                if last is not None and index > last:
+                    break  # the state has converged
+            else:
+                spans, end = lex_line(text, start)
+                self._lines[index] = _Line(text, start, end, tuple(spans))
+                if line is None or line.spans != self._lines[index].spans:
+                    changed = index
+            index += 1
+        self._valid = index
+        return changed
+
+    def spans(self, row, get_line):
+        """Return the spans of `row`, `get_line` returns the text of a row"""
+        for index in range(self._valid, row + 1):
+            start = self._lines[index - 1].end if index else LineState()
+            text = get_line(index)
+            if index == len(self._lines):
+                self._lines.append(None)
+            line = self._lines[index]
+            if line is None or line.text != text or line.start != start:
+                spans, end = lex_line(text, start)
+                self._lines[index] = _Line(text, start, end, tuple(spans))
+        self._valid = max(self._valid, row + 1)
+        return self._lines[row].spans
@@ -0,0 +1,101 @@
+import mmap
+import os
+from bisect import bisect_right
+
+# Separates entries in the history file and in the joined text that is searched.
+_SEPARATOR = '\0'
+
+
+def default_path():
+    return os.path.join(os.path.expanduser('~'), '.turm_history')
+
+
+class History:
+    """The source of the statements that have been run.
+
+    Entries are appended to a file, NUL separated, so adding one is a single write
+    and the file is loaded by decoding a memory map of it in one go. For searching
+    the entries are joined into one string, each one after a NUL, so a search is a
+    `str.rfind` over all of them and the entry a match is in is found by bisecting
+    the offsets of the entries.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._entries = []
+        if path is not None:
+            self._entries = self._load(path)
+        self._offsets = []
+        self._joined = []
+        self._text = None
+        self._length = 0
+        for entry in self._entries:
+            self._index(entry)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, 'rb') as file, mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                text = str(data, 'utf-8', errors='replace')
+        except (FileNotFoundError, ValueError):
+            return []  # there's no history yet, an empty file can't be mapped
+        return [entry for entry in text.split(_SEPARATOR) if entry]
+
+    def _index(self, entry):
+        self._offsets.append(self._length)
+        self._joined.append(_SEPARATOR + entry)
+        self._length += len(entry) + 1
+        self._text = None
+
+    def _get_text(self):
+        if self._text is None:
+            self._text = ''.join(self._joined)
+            self._joined = [self._text]
+        return self._text
+
+    def add(self, entry):
+        entry = entry.rstrip('\n').replace(_SEPARATOR, '')
+        if not entry.strip() or (self._entries and self._entries[-1] == entry):
+            return
+        self._entries.append(entry)
+        self._index(entry)
+        if self._path is None:
+            return
+        try:
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                         0o600)
+            try:
+                os.write(fd, (entry + _SEPARATOR).encode('utf-8'))
+            finally:
+                os.close(fd)
+        except OSError:
+            self._path = None  # carry on without saving the history
+
+    def search(self, query, before=None, prefix=False):
+        """Return the index of the latest entry before `before` that contains `query`
+
+        With `prefix` set the entry has to start with `query`. Returns None if no
+        entry matches.
+        """
+        if before is None:
+            before = len(self._entries)
+        if before <= 0:
+            return None
+        if not query:
+            return before - 1
+        end = self._length
+        if before < len(self._offsets):
+            end = self._offsets[before]
+        if prefix:
+            query = _SEPARATOR + query
+        index = self._get_text().rfind(query, 0, end)
+        if index == -1:
+            return None
+        return bisect_right(self._offsets, index) - 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
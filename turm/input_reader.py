@@ -0,0 +1,109 @@
+import codecs
+import contextlib
+import os
+import select
+
+
+class InputReader:
+    """Reads and decodes input from a file descriptor without blocking.
+
+    The descriptor is put in non-blocking mode once, rather than around every read.
+    Bytes are read in large chunks into a reusable buffer and decoded incrementally,
+    so a multi-byte character split across reads is handled, and the decoded
+    characters are consumed by index.
+    """
+
+    def __init__(self, fd, buffer_size=64 * 1024, encoding='utf-8'):
+        self._fd = fd
+        self._was_blocking = os.get_blocking(fd)
+        os.set_blocking(fd, False)
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._decoder = codecs.getincrementaldecoder(encoding)(
+            errors='replace')
+        self._chars = ''
+        self._index = 0
+        # Set when a read found the end of the input, e.g. the terminal hung up.
+        self.eof = False
+
+    def fileno(self):
+        return self._fd
+
+    def fill(self):
+        """Read whatever input is available, returning False if there was none"""
+        try:
+            count = os.readv(self._fd, [self._buffer])
+        except BlockingIOError:
+            return False
+        self.eof = count == 0
+        if self.eof:
+            return False
+
+        chars = self._decoder.decode(self._view[:count])
+        if self._index == len(self._chars):
+            self._chars = chars
+        else:
+            self._chars = self._chars[self._index:] + chars
+        self._index = 0
+        return True
+
+    def pending(self):
+        return len(self._chars) - self._index
+
+    def get_char(self):
+        """Return the next character, or None if no input is available"""
+        while self._index == len(self._chars):
+            if not self.fill():
+                return None
+        char = self._chars[self._index]
+        self._index += 1
+        return char
+
+    def read_available(self):
+        """Return all of the input that is available without blocking"""
+        while self.fill():
+            pass
+        chars = self._chars[self._index:]
+        self._chars = ''
+        self._index = 0
+        return chars
+
+    def discard_through(self, char):
+        """Drop pending input up to and including the last `char`, if there is one"""
+        self.fill()
+        index = self._chars.rfind(char, self._index)
+        if index == -1:
+            return False
+        self._index = index + 1
+        return True
+
+    def unread(self, chars):
+        """Put `chars` back in front of the input that hasn't been read yet"""
+        self._chars = chars + self._chars[self._index:]
+        self._index = 0
+
+    def read(self, count):
+        """Block until `count` characters can be returned
+
+        Raises EOFError if the input ends first.
+        """
+        while self.pending() < count:
+            if not self.fill():
+                if self.eof:
+                    raise EOFError('the input ended')
+                select.select([self._fd], [], [])
+        chars = self._chars[self._index:self._index + count]
+        self._index += count
+        return chars
+
+    @contextlib.contextmanager
+    def blocking(self):
+        """Temporarily restore blocking reads, e.g. while user code calls `input`"""
+        os.set_blocking(self._fd, True)
+        try:
+            yield
+        finally:
+            os.set_blocking(self._fd, False)
+
+    def close(self):
+        os.set_blocking(self._fd, self._was_blocking)
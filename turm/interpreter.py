@@ -1,26 +1,180 @@
 import sys
+import collections
+import contextlib
+import functools
+import io
 import os
+import queue
+import selectors
+import signal
+import threading
 import tty
 import termios
 import traceback
 from codeop import CommandCompiler
 import turm.escape_codes as escape_codes
 from turm.chars import Chars
+from turm.completeness import CompletenessChecker
+from turm.completion import Completer
 from turm.edit_field import EditField
+from turm.executors import InlineExecutor
+from turm.history import History, default_path
+from turm.input_reader import InputReader
+import turm.output_capture as output_capture
+from turm.output_capture import OutputCapture
+
+
+def _printable(text):
+    # The edit field only takes printable ASCII.
+    if text.isascii() and text.isprintable():
+        return text
+    return ''.join(char for char in text if ' ' <= char <= '~')
+
+
+class _LineInput(io.TextIOBase):
+    """Stands in for stdin while code runs on a worker thread.
+
+    The interpreter reads the terminal while the code runs, so a read wakes it up
+    and waits for it to hand over what's typed, which is echoed and split into
+    lines as it would be by the terminal.
+    """
+
+    def __init__(self, echo, wake_up):
+        self._echo = echo
+        self._wake_up = wake_up
+        # Lines that have been typed, None wakes up a read to be interrupted.
+        self._lines = queue.SimpleQueue()
+        self._line = []
+        self._rest = ''
+        self._waiting = threading.Event()
+
+    def readable(self):
+        return True
+
+    @property
+    def waiting(self):
+        """Whether code is waiting for a line to be typed"""
+        return self._waiting.is_set()
+
+    def readline(self, size=-1):
+        line = self._rest
+        if not line:
+            self._waiting.set()
+            self._wake_up()
+            try:
+                while (line := self._lines.get()) is None:
+                    pass
+            finally:
+                self._waiting.clear()
+        if size is not None and 0 <= size < len(line):
+            line, self._rest = line[:size], line[size:]
+        else:
+            self._rest = ''
+        return line
+
+    def feed(self, text):
+        """Add typed `text` to the line being read, returning what's after its end"""
+        echo = []
+        rest = ''
+        for index, char in enumerate(text):
+            match char:
+                case Chars.NEWLINE:
+                    echo.append(char)
+                    self._line.append(char)
+                case Chars.BACKSPACE if self._line:
+                    echo.append('\b \b')
+                    self._line.pop()
+                    continue
+                case Chars.CTRL_D if not self._line:
+                    pass  # the end of the input
+                case _:
+                    if ' ' <= char <= '~':
+                        echo.append(char)
+                        self._line.append(char)
+                    continue
+            # The line is handed over, what's typed after it is for the next read.
+            self._waiting.clear()
+            self._lines.put(''.join(self._line))
+            self._line.clear()
+            rest = text[index + 1:]
+            break
+        if echo:
+            self._echo(''.join(echo))
+        return rest
+
+    def interrupt(self):
+        """Drop the line being typed and wake up a read, so it can be interrupted"""
+        self._waiting.clear()
+        if self._line:
+            self._echo('\n')
+            self._line.clear()
+        self._lines.put(None)
+
+    def clear(self):
+        """Drop what was typed but not read"""
+        self._line.clear()
+        self._rest = ''
+        while not self._lines.empty():
+            self._lines.get()
+
+
+@contextlib.contextmanager
+def _redirect_stdin(stream):
+    stdin = sys.stdin
+    sys.stdin = stream
+    try:
+        yield
+    finally:
+        sys.stdin = stdin
+
+
+def _without_internal_frames(tb):
+    # An interrupt can be raised while the code is writing output or reading input,
+    # the frames of the output capture and `_LineInput` at the end of its traceback
+    # are left out.
+    internal = (output_capture.__file__, __file__)
+    last = None
+    node = tb
+    while node is not None:
+        if node.tb_frame.f_code.co_filename not in internal:
+            last = node
+        node = node.tb_next
+    if last is not None:
+        last.tb_next = None
+    return tb
 
 
 class Interpreter:
-
-    def __init__(self, locals=None):
+    """A Python prompt that is driven by calling `update` or `run_forever`
+
+    Code is run by `executor`. By default that's inline, so `update` returns once
+    the code has finished. With a `ThreadExecutor` the code runs on a worker thread
+    and `update` carries on handling input: what's typed is kept for when the code
+    has finished, unless the code reads it with `input`, and ctrl-c interrupts it.
+    A `ProcessExecutor` is the same, but the code runs in a worker process with its
+    own variables. What the code outputs is captured and shown a frame at a time,
+    with the middle of floods of output left out, and ctrl-c drops any that hasn't
+    been shown yet.
+
+    The source that is run is added to `history`, by default one saved in
+    ~/.turm_history. Up and down on the first and last rows recall it, and ctrl-r
+    searches it. Tab completes names in `locals`, or indents at the start of a line.
+    """
+
+    def __init__(self, locals=None, executor=None, history=None):
         # Adding '' to sys.path allows us to import local modules.
         sys.path.insert(0, '')
 
         self._setup_tty()
+        self._input = InputReader(sys.stdin.fileno())
+        self._tokenizer = escape_codes.Tokenizer()
+        self._tokens = collections.deque()
 
         # Enable bracketed paste
         sys.stdout.write(escape_codes.enable_bracketed_paste())
         sys.stdout.flush()
         self._bracketed_paste = False
+        self._paste = []
 
         if locals is None:
             locals = {}
@@ -31,11 +185,39 @@ class Interpreter:
 
             locals['exit'] = raise_system_exit
         self._locals = locals
-
-        self._chars = ''
-        self._reset_input_buffer()
+        self._completer = Completer(locals)
+
+        if executor is None:
+            executor = InlineExecutor()
+        self._executor = executor
+        self._job = None
+        # Written to when a job finishes, to wake up `run_forever`. The write end
+        # is None once it has been closed.
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._wakeup_lock = threading.Lock()
+
+        self._editor = EditField(istream=self._input,
+                                 binary=True,
+                                 highlight=True)
+        self._output = OutputCapture(self._editor.output)
+        self._line_input = _LineInput(self._echo, self._wake_up)
+
+        if history is None:
+            history = History(default_path())
+        self._history = history
+        # The entries recalled with up, newest last, and what was typed beforehand.
+        self._history_trail = []
+        self._history_draft = ''
+        # While searching with ctrl-r, the query and the entry it found.
+        self._search_query = None
+        self._search_index = None
 
         self._compile = CommandCompiler()
+        self._compile_cached = functools.lru_cache(maxsize=256)(
+            self._compile_source)
+        self._completeness = CompletenessChecker()
 
         self._run_generator = self._run()
 
@@ -49,8 +231,41 @@ class Interpreter:
         tty_attrs = termios.tcsetattr(sys.stdin.fileno(), termios.TCSANOW,
                                       tty_attrs)
 
-    def _reset_input_buffer(self):
-        self._editor = EditField()
+    @contextlib.contextmanager
+    def _interruptible(self):
+        # Code running in this thread can't be interrupted by reading a ctrl-c, so
+        # the terminal is left to turn it into SIGINT, as it does for python. The
+        # default handler raises KeyboardInterrupt in the code, whatever handler an
+        # event loop it's run from has installed.
+        fd = sys.stdin.fileno()
+        tty_attrs = termios.tcgetattr(fd)
+        tty_attrs[3] |= termios.ISIG
+        handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+        termios.tcsetattr(fd, termios.TCSANOW, tty_attrs)
+        try:
+            yield
+        finally:
+            tty_attrs[3] &= ~termios.ISIG
+            termios.tcsetattr(fd, termios.TCSANOW, tty_attrs)
+            signal.signal(signal.SIGINT, handler)
+
+    def _reset_input_buffer(self, query_cursor=False):
+        self._editor.reset(query_cursor)
+        self._history_trail.clear()
+        self._search_query = None
+
+    @contextlib.contextmanager
+    def _output_to_editor(self):
+        # Output goes through the edit field's terminal, which follows the cursor so
+        # the next prompt can be drawn without asking the terminal where it is.
+        output = self._output
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(
+                output):
+            output.start()
+            try:
+                yield
+            finally:
+                output.stop()
 
     def _handle_escape_code(self, code):
         match code:
@@ -58,109 +273,306 @@ class Interpreter:
                 self._editor.move_cursor_left(code.amount)
             case escape_codes.MoveCursorRight():
                 self._editor.move_cursor_right(code.amount)
+            case escape_codes.MoveCursorUp() if self._editor.on_first_row():
+                self._recall_history(-1)
             case escape_codes.MoveCursorUp():
                 self._editor.move_cursor_up(code.amount)
+            case escape_codes.MoveCursorDown() if (self._history_trail and
+                                                   self._editor.on_last_row()):
+                self._recall_history(1)
             case escape_codes.MoveCursorDown():
                 self._editor.move_cursor_down(code.amount)
             case escape_codes.BracketedPasteStart():
                 self._bracketed_paste = True
             case escape_codes.BracketedPasteEnd():
                 self._bracketed_paste = False
+                self._insert_paste()
             case _:
-                raise Exception()
-
-    def _handle_escape_sequence(self):
-        sequence = '\x1b'
-        while True:
-            char = yield from self._get_char()
-            sequence += char
-            code = escape_codes.parse_escape_code(sequence)
-            if code is not None:
-                self._handle_escape_code(code)
+                pass  # codes that have no meaning for the edit field are ignored
+
+    def _read_tokens(self):
+        chars = self._input.read_available()
+        if not chars and self._input.eof:
+            raise EOFError('the input ended')
+        if chars and self._job is not None:
+            index = chars.rfind(Chars.CTRL_C)
+            if index != -1:
+                # Output that hasn't been shown yet is dropped, the code may be
+                # flooding it.
+                self._output.discard()
+                if self._executor.interrupt():
+                    # Input typed before the ctrl-c is dropped along with it.
+                    self._tokens.clear()
+                    self._line_input.interrupt()
+                    chars = chars[index + 1:]
+        self._tokens.extend(self._tokenizer.feed(chars))
+        # Code running on a thread that's reading a line, e.g. with `input`, gets
+        # what has been typed as it would from the terminal.
+        while self._tokens and self._line_input.waiting:
+            token = self._tokens.popleft()
+            if isinstance(token, str):
+                if rest := self._line_input.feed(token):
+                    self._tokens.appendleft(rest)
+        return bool(chars)
+
+    def _next_token(self):
+        # Input is read while code is running, so it can be interrupted, but it's
+        # only handled once the code has finished.
+        while not self._finish_job():
+            self._read_tokens()
+            yield
+        while not self._tokens:
+            if not self._read_tokens():
+                yield
+        return self._tokens.popleft()
+
+    def _show_entry(self, text):
+        self._editor.set_text(''.join(char for char in text
+                                      if ' ' <= char <= '~' or char == '\n'))
+
+    def _recall_history(self, step):
+        # Going up recalls the entries that start with what was typed beforehand.
+        if step < 0:
+            if not self._history_trail:
+                self._history_draft = str(self._editor)
+                before = None
+            else:
+                before = self._history_trail[-1]
+            index = self._history.search(self._history_draft,
+                                         before,
+                                         prefix=True)
+            if index is None:
                 return
+            self._history_trail.append(index)
+        else:
+            self._history_trail.pop()
 
-    def _get_char(self):
-        while not self._chars:
-            # Read from stdin without blocking
-            os.set_blocking(sys.stdin.fileno(), False)
-            self._chars = sys.stdin.read(100)
-            os.set_blocking(sys.stdin.fileno(), True)
+        if self._history_trail:
+            self._show_entry(self._history[self._history_trail[-1]])
+        else:
+            self._show_entry(self._history_draft)
 
-            if self._chars:
-                break
-            else:
-                sys.stdout.flush()
-                yield
+    def _search_history(self, query, before=None):
+        index = self._history.search(query, before)
+        if index is None:
+            prompt = f"(failed reverse-i-search)`{query}': "
+        else:
+            prompt = f"(reverse-i-search)`{query}': "
+            self._search_index = index
+            self._show_entry(self._history[index])
+        self._search_query = query
+        self._editor.set_prompt(0, prompt)
+
+    def _handle_search_token(self, token):
+        """Handle a token while searching with ctrl-r, False if it ends the search"""
+        query = self._search_query
+        match token:
+            case Chars.CTRL_R:
+                self._search_history(query, self._search_index)
+            case Chars.BACKSPACE:
+                self._search_history(query[:-1])
+            case str() if token >= ' ':
+                # The current entry can still match the longer query.
+                before = None
+                if self._search_index is not None:
+                    before = self._search_index + 1
+                self._search_history(query + token, before)
+            case _:
+                self._search_query = None
+                self._search_index = None
+                self._editor.set_prompt(0)
+                return False
+        return True
+
+    def _show_candidates(self, candidates):
+        width = max(map(len, candidates)) + 2
+        columns = max(self._editor.screen_width // width, 1)
+        max_rows = max(self._editor.screen_height - 2, 1)
+        rows = [
+            ''.join(name.ljust(width) for name in candidates[i:i + columns])
+            for i in range(0, len(candidates), columns)
+        ]
+        if len(rows) > max_rows:
+            hidden = len(candidates) - (max_rows - 1) * columns
+            rows[max_rows - 1:] = [f'... and {hidden} more']
+        self._editor.show_below(''.join(row.rstrip() + '\n' for row in rows))
+
+    def _complete(self):
+        line = self._editor.line_before_cursor()
+        if not line.strip():
+            self._editor.insert_text(' ' * 4)
+            return
 
-        x = self._chars[0]
-        self._chars = self._chars[1:]
-        return x
+        start, candidates = self._completer.complete(line)
+        candidates = [name for name in candidates if name.isascii()]
+        if not candidates:
+            return
+        word = line[start:]
+        common = os.path.commonprefix(candidates)
+        if len(common) > len(word):
+            self._editor.insert_text(common[len(word):])
+        elif len(candidates) > 1:
+            self._show_candidates(candidates)
 
     def _handle_ctrl_c(self):
-        sys.stdout.write('\nKeyboardInterrupt\n')
+        self._editor.move_cursor_to_end()
+        self._editor.write_output('\nKeyboardInterrupt\n')
         self._reset_input_buffer()
 
-    def _handle_newline(self):
-        if self._bracketed_paste:
-            self._editor.newline()
-        else:
-            self._try_run_source()
+    def _insert_paste(self):
+        text = ''.join(self._paste)
+        self._paste.clear()
+        if text:
+            self._editor.insert_text(text)
+
+    def _add_to_paste(self, text):
+        # Pasted text is collected and inserted as one edit when the paste ends.
+        match text:
+            case Chars.TAB:
+                self._paste.append(' ' * 4)
+            case Chars.NEWLINE | '\r':
+                self._paste.append(Chars.NEWLINE)
+            case _:
+                self._paste.append(_printable(text))
 
     def _run(self):
         while True:
-            char = yield from self._get_char()
+            token = yield from self._next_token()
 
-            match char:
-                case Chars.ESCAPE:
-                    yield from self._handle_escape_sequence()
-                case Chars.CTRL_C:
-                    self._handle_ctrl_c()
-                case Chars.BACKSPACE:
-                    self._editor.backspace()
-                case Chars.TAB:
-                    for _ in range(4):
-                        self._editor.insert(' ')
-                case Chars.NEWLINE:
-                    self._handle_newline()
-                case _:
-                    self._editor.insert(char)
+            if (self._search_query is not None and not self._bracketed_paste
+                    and self._handle_search_token(token)):
+                continue
+
+            if not isinstance(token, str):
+                self._handle_escape_code(token)
+            elif self._bracketed_paste:
+                self._add_to_paste(token)
+            else:
+                match token:
+                    case Chars.CTRL_C:
+                        self._handle_ctrl_c()
+                    case Chars.CTRL_R:
+                        self._search_index = None
+                        self._search_history('')
+                    case Chars.BACKSPACE:
+                        self._editor.backspace()
+                    case Chars.TAB:
+                        self._complete()
+                    case Chars.NEWLINE:
+                        self._try_run_source()
+                    case _ if text := _printable(token):
+                        self._editor.insert_text(text)
 
     def _reset_term(self):
-        termios.tcsetattr(sys.stdin.fileno(), termios.TCSAFLUSH,
-                          self._tty_attrs)
+        # Jobs are finished with before the pipe they wake up is closed.
+        self._executor.shutdown()
+        with self._wakeup_lock:
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+            self._wakeup_write = None
+        self._input.close()
+        with contextlib.suppress(termios.error):
+            # A terminal that has hung up can't be reset. Code running on a thread
+            # may have replaced sys.stdin.
+            termios.tcsetattr(self._input.fileno(), termios.TCSAFLUSH,
+                              self._tty_attrs)
+
+    def _compile_source(self, source, symbol, flags):
+        # `flags` is only part of the cache key, a future import changes them.
+        return self._compile(source, symbol=symbol)
 
     def _try_run_source(self):
         source = str(self._editor)
-        lines = source.splitlines()
-
-        if len(lines) > 1 and not source.endswith('\n'):
+        symbol = self._completeness.check(source)
+        if symbol is None:
             self._editor.newline()
             return
 
         try:
-            symbol = 'single'
-            if source.find('\n') != len(source) - 1:
-                symbol = 'exec'
-
-            code = self._compile(source, symbol=symbol)
+            code = self._compile_cached(source, symbol,
+                                        self._compile.compiler.flags)
             if code is None:
                 self._editor.newline()
                 return
         except (OverflowError, SyntaxError, ValueError) as e:
-            self._showtraceback(e, None, source)
+            self._history.add(source)
+            self._editor.move_cursor_to_end()
+            self._editor.write_output('\n')
+            with self._output_to_editor():
+                self._showtraceback(e, None, source)
             self._reset_input_buffer()
             return
 
-        sys.stdout.write('\n')
-        try:
-            exec(code, self._locals)
-        except SystemExit as e:
-            self._reset_term()
-            raise e
-        except Exception as e:
-            self._showtraceback(e, e.__traceback__.tb_next)
+        self._history.add(source)
+        self._editor.move_cursor_to_end()
+        self._editor.write_output('\n')
+        self._run_code(code)
 
-        self._reset_input_buffer()
+    def _run_code(self, code):
+        if self._executor.isolated:
+            self._output.start()
+            self._job = self._executor.submit_code(code, self._output)
+        else:
+            self._job = self._executor.submit(
+                functools.partial(self._exec_code, code))
+        if not self._job.done():
+            self._job.add_done_callback(lambda job: self._wake_up())
+        self._finish_job()
+
+    def _wake_up(self):
+        # Called from the thread running a job, when it's finished or reading input.
+        with self._wakeup_lock:
+            if self._wakeup_write is None:
+                return  # the interpreter has exited, the descriptor may be reused
+            try:
+                os.write(self._wakeup_write, b'\0')
+            except BlockingIOError:
+                pass  # it's already full of wake ups
+
+    def _echo(self, text):
+        self._output.write(text)
+        self._output.flush()
+
+    def _exec_code(self, code):
+        with self._output_to_editor():
+            try:
+                if self._executor.threaded:
+                    # stdin is read by this thread, lines typed are handed over.
+                    with _redirect_stdin(self._line_input):
+                        exec(code, self._locals)
+                else:
+                    # User code might read from stdin, e.g. with `input`.
+                    with self._input.blocking(), self._interruptible():
+                        exec(code, self._locals)
+            except SystemExit:
+                raise
+            except (Exception, KeyboardInterrupt) as e:
+                if isinstance(e, KeyboardInterrupt):
+                    # Output that hasn't been shown yet is dropped, the code may
+                    # have been flooding it.
+                    self._output.discard()
+                self._showtraceback(
+                    e, _without_internal_frames(e.__traceback__.tb_next))
+
+    def _finish_job(self):
+        """Start a new prompt if the running code is done, return False if it isn't"""
+        job = self._job
+        if job is None:
+            return True
+        if not job.done():
+            return False
+
+        self._job = None
+        self._output.stop()
+        self._line_input.clear()
+        if isinstance(job.exception, SystemExit):
+            self._reset_term()
+            raise job.exception
+        # Code run in this process can write to the terminal without going through
+        # sys.stdout, e.g. with os.system, the output of a worker process is all
+        # captured.
+        self._reset_input_buffer(query_cursor=not self._executor.isolated)
+        return True
 
     def _showtraceback(self, e, tb, source=''):
         typ = type(e)
@@ -196,20 +608,41 @@ class Interpreter:
         lines = traceback.format_exception(typ, value, tb)
         sys.stderr.write(''.join(lines))
 
+    def _end_input(self):
+        # stdin was closed, e.g. the terminal hung up, so there's no more input.
+        self._executor.interrupt()
+        self._line_input.interrupt()
+        self._reset_term()
+
     def update(self):
-        next(self._run_generator)
+        try:
+            next(self._run_generator)
+        except EOFError:
+            self._end_input()
+            raise SystemExit from None
+
+    def run_forever(self, timeout=None):
+        """Run the interpreter, waking up when there is input to handle
+
+        Unlike calling `update` in a loop this doesn't poll, it blocks until stdin
+        is readable, running code has finished or `timeout` seconds have passed.
+        """
+        with selectors.DefaultSelector() as selector:
+            selector.register(sys.stdin.fileno(), selectors.EVENT_READ)
+            selector.register(self._wakeup_read, selectors.EVENT_READ)
+            while True:
+                self.update()
+                for key, _ in selector.select(timeout):
+                    if key.fd == self._wakeup_read:
+                        os.read(self._wakeup_read, 4096)
 
 
 def main():
-    import time
-
     x = Interpreter()
-    while True:
-        try:
-            x.update()
-        except SystemExit as e:
-            break
-        time.sleep(1 / 30)
+    try:
+        x.run_forever()
+    except SystemExit:
+        pass
 
 
 if __name__ == '__main__':
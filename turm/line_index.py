@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+
+
+class LineIndex:
+    """Positions of the newlines in a text, kept up to date as the text is edited.
+
+    Like a gap buffer the newlines are split at the last edit position. Newlines
+    before the split are stored as absolute positions and newlines after it are
+    stored as distances from the end of the text, so edits at the split don't need
+    to shift any stored positions. Lookups are O(1) or O(log lines).
+    """
+
+    def __init__(self):
+        self._head = []
+        # Distances from the end of the text, the newline closest to the split is last.
+        self._tail = []
+        self._length = 0
+        self._split = 0
+
+    def _move_split(self, index):
+        head = self._head
+        tail = self._tail
+        while head and head[-1] >= index:
+            tail.append(self._length - head.pop())
+        while tail and self._length - tail[-1] < index:
+            head.append(self._length - tail.pop())
+        self._split = index
+
+    def insert(self, index, text):
+        self._move_split(index)
+        newline = text.find('\n')
+        while newline != -1:
+            self._head.append(index + newline)
+            newline = text.find('\n', newline + 1)
+        self._length += len(text)
+        self._split = index + len(text)
+
+    def delete(self, start, end):
+        self._move_split(start)
+        while self._tail and self._length - self._tail[-1] < end:
+            self._tail.pop()
+        self._length -= end - start
+
+    def _newline(self, n):
+        if n < len(self._head):
+            return self._head[n]
+        return self._length - self._tail[len(self._tail) - 1 -
+                                         (n - len(self._head))]
+
+    def line_count(self):
+        return len(self._head) + len(self._tail) + 1
+
+    def line_start(self, row):
+        assert 0 <= row < self.line_count()
+        if row == 0:
+            return 0
+        return self._newline(row - 1) + 1
+
+    def line_end(self, row):
+        """The index of the newline that ends `row`, or the text length for the last row"""
+        assert 0 <= row < self.line_count()
+        if row == self.line_count() - 1:
+            return self._length
+        return self._newline(row)
+
+    def row_of(self, index):
+        """The row containing `index`, a newline belongs to the row it ends"""
+        rows_before = bisect_left(self._head, index)
+        rows_after = len(self._tail) - bisect_right(self._tail,
+                                                    self._length - index)
+        return rows_before + rows_after
+
+    def line_offsets(self):
+        return [0] + [x + 1 for x in self._head] + [
+            self._length - x + 1 for x in reversed(self._tail)
+        ]
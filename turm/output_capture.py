@@ -0,0 +1,149 @@
+import collections
+import io
+import threading
+
+
+class OutputCapture(io.TextIOBase):
+    """A stream for the output of running code, which is shown a frame at a time.
+
+    Writing only adds to a buffer, so code that floods its output isn't held up by
+    the terminal. While started, a thread renders what has been written to `output`
+    every `frame_interval` seconds, and flushing renders it straight away. The
+    buffer is bounded: of the lines written within a frame the first and last
+    `max_lines // 2` are kept and the middle is replaced by a line saying how many
+    were skipped, and the part of a line past `max_line_length` is cut off the same
+    way.
+    """
+
+    frame_interval = 1 / 60
+
+    def __init__(self, output, max_lines=200, max_line_length=4000):
+        self._output = output
+        self.max_lines = max_lines
+        self.max_line_length = max_line_length
+        self._lock = threading.Lock()
+        # Held while rendering, so frames are written one at a time and in order.
+        self._render_lock = threading.Lock()
+        self._head = []
+        self._tail = collections.deque(maxlen=max_lines // 2)
+        self._skipped = 0
+        # The line that hasn't ended yet and how much of it has been cut off.
+        self._line = []
+        self._line_length = 0
+        self._cut = 0
+        self._stop = None
+        self._thread = None
+
+    @property
+    def encoding(self):
+        return self._output.encoding
+
+    def writable(self):
+        return True
+
+    def _add_text(self, text):
+        room = self.max_line_length - self._line_length
+        if len(text) > room:
+            self._cut += len(text) - room
+            text = text[:room]
+        if text:
+            self._line.append(text)
+            self._line_length += len(text)
+
+    def _take_line(self):
+        line = ''.join(self._line)
+        if self._cut:
+            line += f' [... {self._cut} characters skipped]'
+        self._line.clear()
+        self._line_length = 0
+        self._cut = 0
+        return line
+
+    def _end_line(self):
+        line = self._take_line()
+        if not self._tail and len(self._head) < self.max_lines // 2:
+            self._head.append(line)
+            return
+        if len(self._tail) == self._tail.maxlen:
+            self._skipped += 1
+        self._tail.append(line)
+
+    def write(self, text):
+        lines = text.split('\n')
+        last = len(lines) - 1
+        with self._lock:
+            self._add_text(lines[0])
+            if last == 0:
+                return len(text)
+            self._end_line()
+
+            index = 1
+            while index < last and not self._tail and len(
+                    self._head) < self.max_lines // 2:
+                self._add_text(lines[index])
+                self._end_line()
+                index += 1
+            # Lines that would be pushed out of the tail straight away are counted
+            # without being added.
+            kept = max(index, last - self._tail.maxlen)
+            self._skipped += kept - index
+            for line in lines[kept:last]:
+                self._add_text(line)
+                self._end_line()
+            self._add_text(lines[last])
+        return len(text)
+
+    def _take(self):
+        with self._lock:
+            lines = self._head
+            if self._skipped:
+                lines.append(f'[... {self._skipped} lines skipped ...]')
+            lines.extend(self._tail)
+            lines.append(self._take_line())
+            self._head = []
+            self._tail.clear()
+            self._skipped = 0
+        return '\n'.join(lines)
+
+    def render(self):
+        """Write what has been captured since the last render to the output"""
+        with self._render_lock:
+            text = self._take()
+            if text:
+                self._output.write(text)
+                self._output.flush()
+
+    def flush(self):
+        # An explicit flush, e.g. by `input` for its prompt, shows the output now.
+        self.render()
+
+    def discard(self):
+        """Drop what has been captured but not rendered yet"""
+        with self._lock:
+            self._head.clear()
+            self._tail.clear()
+            self._skipped = 0
+            self._take_line()
+
+    def _pace(self, stop):
+        while not stop.wait(self.frame_interval):
+            self.render()
+
+    def start(self):
+        """Start rendering a frame at a time"""
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pace,
+                                        args=(self._stop, ),
+                                        name='turm-output',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop rendering frames and render what is left"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.render()
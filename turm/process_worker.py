@@ -0,0 +1,86 @@
+"""The process that a `ProcessExecutor` runs code in
+
+Code objects are read from the request descriptor, each one a 4 byte length
+followed by the marshalled code. They are run in one namespace, with stdout and
+stderr going back to the interpreter. After each one a status is written, b'D'
+when it's done or b'X' and an exit code when it raised SystemExit.
+"""
+import marshal
+import os
+import signal
+import struct
+import sys
+import traceback
+
+HEADER = struct.Struct('!I')
+STATUS = struct.Struct('!ci')
+
+
+def _read_exactly(fd, size):
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_code(fd):
+    while True:
+        try:
+            header = _read_exactly(fd, HEADER.size)
+            if header is None:
+                return None
+            return marshal.loads(_read_exactly(fd, HEADER.unpack(header)[0]))
+        except KeyboardInterrupt:
+            pass  # an interrupt that came after the code had finished
+
+
+def _exit_status(e):
+    match e.code:
+        case None:
+            return 0
+        case int():
+            return e.code
+        case _:
+            print(e.code, file=sys.stderr)
+            return 1
+
+
+def _run(code, namespace):
+    try:
+        exec(code, namespace)
+    except SystemExit as e:
+        return STATUS.pack(b'X', _exit_status(e))
+    except BaseException as e:
+        traceback.print_exception(e.with_traceback(e.__traceback__.tb_next))
+    return STATUS.pack(b'D', 0)
+
+
+def main(request_fd, status_fd):
+    namespace = {'__name__': '__main__', '__builtins__': __builtins__}
+    while True:
+        # Interrupts are held while there's no code running, one that comes after
+        # the code has finished is raised once waiting for the next code.
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+        code = _read_code(request_fd)
+        if code is None:
+            return
+        try:
+            status = _run(code, namespace)
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
+        except KeyboardInterrupt:
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
+            status = STATUS.pack(b'D', 0)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.write(status_fd, status)
+        if status[:1] == b'X':
+            return
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,40 @@
+class Prompts:
+    """The prompt of each row of an edit field.
+
+    The first row has `ps1` and every other row has `ps2`, unless a prompt has been
+    set for the row. Only those are stored, so looking up a prompt is O(1) and rows
+    can be added or removed without a list of prompts to shift.
+    """
+
+    def __init__(self, ps1='>>> ', ps2='... '):
+        self.ps1 = ps1
+        self.ps2 = ps2
+        self._overrides = {}
+
+    def __getitem__(self, row):
+        if self._overrides:
+            prompt = self._overrides.get(row)
+            if prompt is not None:
+                return prompt
+        return self.ps1 if row == 0 else self.ps2
+
+    def __setitem__(self, row, prompt):
+        self._overrides[row] = prompt
+
+    def __delitem__(self, row):
+        self._overrides.pop(row, None)
+
+    def insert_rows(self, row, count=1):
+        """Make room for `count` new rows with the default prompt before `row`"""
+        if self._overrides and count:
+            self._overrides = {(r + count if r >= row else r): prompt
+                               for r, prompt in self._overrides.items()}
+
+    def delete_rows(self, row, count=1):
+        if self._overrides and count:
+            self._overrides = {(r - count if r >= row else r): prompt
+                               for r, prompt in self._overrides.items()
+                               if not row <= r < row + count}
+
+    def clear(self):
+        self._overrides.clear()
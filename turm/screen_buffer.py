@@ -0,0 +1,125 @@
+from array import array
+
+# Cell values, other than these cells hold the code point of their character.
+# A cell that hasn't been drawn to, so whatever the terminal shows there is unknown.
+UNKNOWN = 0
+# An erased cell. It's a lone surrogate, which is never written as text.
+BLANK = 0xDFFF
+
+
+class ScreenBuffer:
+    """A grid of screen cells kept in one flat array of code points.
+
+    Rows are slices of the array, so erasing, copying and scrolling rows are slice
+    assignments rather than loops over cell objects. With `attributes` set a
+    parallel array holds a style number for every cell. Rows and columns are
+    indexed from 0.
+    """
+
+    def __init__(self, width, height, attributes=False):
+        self.width = width
+        self.height = height
+        self.cells = array('I', [UNKNOWN]) * (width * height)
+        self.attributes = None
+        if attributes:
+            self._plain_row = array('H', [0]) * width
+            self.attributes = self._plain_row * height
+        # Whole rows of a value, to fill rows from without building a new array.
+        self._fill_rows = {}
+
+    def _fill_row_of(self, value):
+        row = self._fill_rows.get(value)
+        if row is None:
+            row = self._fill_rows[value] = array('I', [value]) * self.width
+        return row
+
+    def _span(self, row, start, end):
+        assert 0 <= row < self.height
+        base = row * self.width
+        if end is None or end > self.width:
+            end = self.width
+        return base + start, base + end
+
+    def get(self, row, column):
+        return self.cells[row * self.width + column]
+
+    def get_attribute(self, row, column):
+        return self.attributes[row * self.width + column]
+
+    def row(self, row, start=0, end=None):
+        """Return a copy of the cells of `row`"""
+        start, end = self._span(row, start, end)
+        return self.cells[start:end]
+
+    def row_attributes(self, row, start=0, end=None):
+        """Return a copy of the attributes of `row`"""
+        start, end = self._span(row, start, end)
+        return self.attributes[start:end]
+
+    def write(self, row, column, text, attribute=0):
+        """Write `text` into `row` from `column`, anything past the edge is dropped"""
+        if column >= self.width:
+            return
+        text = text[:self.width - column]
+        start, end = self._span(row, column, column + len(text))
+        self.cells[start:end] = array('I', map(ord, text))
+        if self.attributes is not None:
+            self.attributes[start:end] = array('H', [attribute]) * len(text)
+
+    def fill_row(self, row, value, start=0):
+        start, end = self._span(row, start, None)
+        self.cells[start:end] = self._fill_row_of(value)[:end - start]
+        if self.attributes is not None:
+            self.attributes[start:end] = self._plain_row[:end - start]
+
+    def fill(self, value):
+        for row in range(self.height):
+            self.fill_row(row, value)
+
+    def copy_row(self, other, row, start=0, end=None):
+        """Copy cells of `row` from another buffer of the same size"""
+        start, end = self._span(row, start, end)
+        self.cells[start:end] = other.cells[start:end]
+        if self.attributes is not None:
+            self.attributes[start:end] = other.attributes[start:end]
+
+    def row_equals(self, other, row):
+        start, end = self._span(row, 0, None)
+        if self.cells[start:end] != other.cells[start:end]:
+            return False
+        return (self.attributes is None
+                or self.attributes[start:end] == other.attributes[start:end])
+
+    def scroll_up(self, count, value=UNKNOWN):
+        """Move the rows up by `count`, filling the rows left at the bottom"""
+        count = min(count, self.height)
+        shift = count * self.width
+        kept = len(self.cells) - shift
+        self.cells[:kept] = self.cells[shift:]
+        if self.attributes is not None:
+            self.attributes[:kept] = self.attributes[shift:]
+        for row in range(self.height - count, self.height):
+            self.fill_row(row, value)
+
+    def text(self, row, start=0, end=None):
+        """Return the characters of `row`, unknown and erased cells are spaces"""
+        text = ''.join(map(chr, self.row(row, start, end)))
+        return text.replace('\0', ' ').replace(chr(BLANK), ' ')
+
+    def resized(self, width, height):
+        """Return a buffer of another size holding as much of this one as fits"""
+        buffer = ScreenBuffer(width, height, self.attributes is not None)
+        columns = min(width, self.width)
+        for row in range(min(height, self.height)):
+            source = slice(row * self.width, row * self.width + columns)
+            target = slice(row * width, row * width + columns)
+            buffer.cells[target] = self.cells[source]
+            if self.attributes is not None:
+                buffer.attributes[target] = self.attributes[source]
+        return buffer
+
+    def nbytes(self):
+        size = len(self.cells) * self.cells.itemsize
+        if self.attributes is not None:
+            size += len(self.attributes) * self.attributes.itemsize
+        return size
@@ -1,94 +1,442 @@
+import functools
+import io
+import os
+import re
+import select
+import signal
+import threading
+import unicodedata
 import turm.escape_codes as escape_codes
+from turm.screen_buffer import BLANK, UNKNOWN, ScreenBuffer
+
+# Counts the SIGWINCH signals received, each Term compares it to the count when its
+# size was last read to know when the window has been resized.
+_resize_count = 0
+_watching_resizes = False
+
+# Escape sequences and control characters that don't move the cursor, and the ones
+# that do, for following the cursor through program output. OSC, DCS and the other
+# string sequences run up to BEL or ST, e.g. one that sets the window title.
+_INVISIBLE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]'
+                        r'|\x1b[\]PX^_].*?(?:\x07|\x1b\\|$)'
+                        r'|\x1b[^\[]?'
+                        r'|[\x00-\x07\x0b-\x0c\x0e-\x1f\x7f]', re.DOTALL)
+_MOVEMENT = re.compile(r'([\n\r\t\b])')
+
+
+def _text_width(text):
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        if unicodedata.combining(char):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+    return width
+
+
+def _handle_sigwinch(signum, frame, previous_handler=None):
+    global _resize_count
+    _resize_count += 1
+    if callable(previous_handler):
+        previous_handler(signum, frame)
+
+
+def _watch_resizes():
+    global _watching_resizes
+    if (_watching_resizes or not hasattr(signal, 'SIGWINCH')
+            or threading.current_thread() is not threading.main_thread()):
+        return
+    previous_handler = signal.getsignal(signal.SIGWINCH)
+    signal.signal(
+        signal.SIGWINCH,
+        functools.partial(_handle_sigwinch, previous_handler=previous_handler))
+    _watching_resizes = True
+
 
 class Term:
+    """A model of the terminal screen that is drawn to with minimal output.
+
+    Writes and cursor movements only change the back buffer. `flush` compares it to
+    the front buffer, which holds what has been sent to the terminal, and outputs
+    just the cells that differ. Cells that haven't been drawn to are UNKNOWN in both
+    buffers, so whatever is on the terminal there is left alone. Erased cells are
+    kept apart from written spaces so the blank end of a row can be cleared with an
+    erase code, while spaces that were written are preserved.
 
-    def __init__(self, istream, ostream):
+    Each cell also has an attribute, the `escape_codes.select_graphic_rendition`
+    parameter it's drawn with, e.g. a colour, or 0 for plain text. The terminal is
+    left drawing plain text after every flush.
+
+    With `binary` set frames are built from pre-encoded escape codes and written as
+    bytes straight to the output stream's file descriptor.
+    """
+
+    def __init__(self, istream, ostream, binary=False):
         self._istream = istream
         self._ostream = ostream
+        try:
+            self._fd = ostream.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            self._fd = None
+        self._encoding = getattr(ostream, 'encoding', None) or 'utf-8'
+
+        # Everything output by a flush is collected here and sent in one write.
+        self._binary = binary
+        if binary:
+            assert self._fd is not None, 'binary mode needs a file descriptor'
+            self._codes = escape_codes.b
+            self._frame = io.BytesIO()
+        else:
+            self._codes = escape_codes
+            self._frame = io.StringIO()
+
         self._init_screen_dimensions()
-        self._lines = [[' ' for _ in range(self.screen_width)] for _ in range(self.screen_height)]
+        self._front = ScreenBuffer(self.screen_width,
+                                   self.screen_height,
+                                   attributes=True)
+        self._back = ScreenBuffer(self.screen_width,
+                                  self.screen_height,
+                                  attributes=True)
+        self._dirty_rows = set()
+        self._output_attribute = 0
+        self._scrolled = 0
+
+    def _get_terminal_size(self):
+        if self._fd is None:
+            return None
+        try:
+            # This is an ioctl(TIOCGWINSZ), no round trip to the terminal needed.
+            return os.get_terminal_size(self._fd)
+        except OSError:
+            return None
 
     def _init_screen_dimensions(self):
+        self._seen_resize_count = _resize_count
+        size = self._get_terminal_size()
+        if size is None:
+            self._probe_screen_dimensions()
+        else:
+            _watch_resizes()
+            self.screen_width, self.screen_height = size
+            self._update_cursor_position()
+            self._output_position = (self.row, self.column)
+
+    def _probe_screen_dimensions(self):
         # save the current position
         self._update_cursor_position()
         saved_position = (self.row, self.column)
 
         # Move the cursor far left and down, it will only
         # move as far as the screen dimensions allow.
-        self.move_cursor_to(9999, 9999)
+        self._ostream.write(escape_codes.move_cursor_to(9999, 9999))
 
         self._update_cursor_position()
         self.screen_height = self.row
         self.screen_width = self.column
 
         # restore the cursor position
-        self.move_cursor_to(*saved_position)
+        self.row, self.column = saved_position
+        self._ostream.write(escape_codes.move_cursor_to(*saved_position))
+        self._output_position = saved_position
 
     def _update_cursor_position(self):
         self._ostream.write(escape_codes.request_cursor_position())
         self._ostream.flush()
-        chars = self._istream.read(2)
-        assert chars == '\x1b['
+
+        # Keys typed before the report arrives are given back to the input stream,
+        # or dropped if it can't take them back as an `InputReader` can.
+        unread = getattr(self._istream, 'unread', None)
+        tokenizer = escape_codes.Tokenizer()
+        typed = []
+        chars = ''
         while True:
-            chars += self._istream.read(1)
-            code = escape_codes.parse_escape_code(chars)
-            if code is not None:
-                assert isinstance(code, escape_codes.ReportedCursorPosition)
-                self.row = code.row
-                self.column = code.column
-                return
-
-    def write(self, chars):
-        for char in chars:
-            self._lines[self.row - 1][self.column - 1] = char
-            if char == '\n':
-                self.column = 0
-                self.row += 1
-            else:
-                self.column += 1
-
-        self._ostream.write(chars)
+            char = self._istream.read(1)
+            chars += char
+            for code in tokenizer.feed(char):
+                if isinstance(code, escape_codes.ReportedCursorPosition):
+                    self.row = code.row
+                    self.column = code.column
+                    if typed and unread is not None:
+                        unread(''.join(typed))
+                    return
+            if not tokenizer.in_sequence():
+                typed.append(chars)
+                chars = ''
 
-    def flush(self):
+    def write(self, chars, attribute=0):
+        for index, line in enumerate(chars.split('\n')):
+            if index:
+                self.column = 1
+                self.row = min(self.row + 1, self.screen_height)
+            self._dirty_rows.add(self.row - 1)
+            self._back.write(self.row - 1, self.column - 1, line, attribute)
+            self.column += len(line)
+
+    def _move_output_to(self, row, column):
+        if self._output_position != (row, column):
+            self._frame.write(self._codes.move_cursor_to(row, column))
+            self._output_position = (row, column)
+
+    def _set_output_attribute(self, attribute):
+        if attribute == self._output_attribute:
+            return
+        if attribute == 0:
+            self._frame.write(self._codes.RESET_ATTRIBUTES)
+        elif self._output_attribute == 0:
+            self._frame.write(self._codes.select_graphic_rendition(attribute))
+        else:
+            # Attributes like bold and colours combine, so clear the last one.
+            self._frame.write(self._codes.select_graphic_rendition(
+                0, attribute))
+        self._output_attribute = attribute
+
+    def _flush_row(self, index):
+        if self._back.row_equals(self._front, index):
+            return
+        back = self._back.row(index)
+        front = self._front.row(index)
+        back_attributes = self._back.row_attributes(index)
+        front_attributes = self._front.row_attributes(index)
+
+        # Everything after `blank_start` is blank and can be cleared with one erase.
+        blank_start = len(back)
+        while blank_start > 0 and back[blank_start - 1] == BLANK:
+            blank_start -= 1
+
+        column = 0
+        while column < blank_start:
+            if back[column] == UNKNOWN or (
+                    back[column] == front[column]
+                    and back_attributes[column] == front_attributes[column]):
+                column += 1
+                continue
+
+            # Extend the run over short stretches of unchanged cells, rewriting them
+            # is cheaper than moving the cursor past them. A run has one attribute.
+            attribute = back_attributes[column]
+            end = column + 1
+            run_end = end
+            while (end < blank_start and back[end] != UNKNOWN
+                   and back_attributes[end] == attribute
+                   and end - run_end < 4):
+                end += 1
+                if (back[end - 1] != front[end - 1]
+                        or attribute != front_attributes[end - 1]):
+                    run_end = end
+
+            self._move_output_to(index + 1, column + 1)
+            self._set_output_attribute(attribute)
+            text = self._back.text(index, column, run_end)
+            if self._binary:
+                text = text.encode(self._encoding)
+            self._frame.write(text)
+            self._front.copy_row(self._back, index, column, run_end)
+            self._output_position = (index + 1, run_end + 1)
+            column = run_end
+
+        for column in range(blank_start, len(back)):
+            if front[column] != BLANK:
+                self._move_output_to(index + 1, column + 1)
+                self._set_output_attribute(0)
+                self._frame.write(self._codes.ERASE_FROM_CURSOR_TO_END_OF_LINE)
+                self._front.copy_row(self._back, index, column)
+                break
+
+    def _write_fd(self, data):
+        # Anything already written through the stream has to go out first.
         self._ostream.flush()
+        data = memoryview(data)
+        while data:
+            try:
+                data = data[os.write(self._fd, data):]
+            except BlockingIOError:
+                # The descriptor can share non-blocking mode with stdin.
+                select.select([], [self._fd], [])
+
+    def _send_frame(self):
+        if self._binary:
+            # Write straight from the frame's buffer without copying it.
+            with self._frame.getbuffer() as data:
+                self._write_fd(data)
+        elif self._fd is None:
+            self._ostream.write(self._frame.getvalue())
+            self._ostream.flush()
+        else:
+            self._write_fd(self._frame.getvalue().encode(self._encoding))
+
+        self._frame.seek(0)
+        self._frame.truncate()
+
+    def _resize(self):
+        self._seen_resize_count = _resize_count
+        size = self._get_terminal_size()
+        if size is None or size == (self.screen_width, self.screen_height):
+            return
+
+        # Keep what was drawn as far as it fits, but the terminal may have
+        # rearranged its contents so all of it is drawn again.
+        width, height = size
+        self._back = self._back.resized(width, height)
+        self._front = ScreenBuffer(width, height, attributes=True)
+        self._dirty_rows = set(range(height))
+        self.screen_width, self.screen_height = width, height
+        self.row = min(self.row, height)
+        self.column = min(self.column, width)
+        self._output_position = None
+
+    def flush(self):
+        if self._seen_resize_count != _resize_count:
+            self._resize()
+
+        for index in sorted(self._dirty_rows):
+            self._flush_row(index)
+        self._dirty_rows.clear()
+        self._set_output_attribute(0)
+        self._move_output_to(self.row, self.column)
+
+        if self._frame.tell() == 0:
+            return  # nothing changed
+        self._send_frame()
+
+    def reset(self, query_cursor=False):
+        """Forget what is on the screen and start drawing from the cursor
+
+        The buffers are kept and refilled rather than allocated again. The cursor
+        position is the one tracked so far, so the terminal isn't queried, unless
+        `query_cursor` is set because output may have gone to the terminal without
+        passing through `write_output`.
+        """
+        if self.column > self.screen_width:
+            # The terminal is waiting to wrap, move to the next line like it would.
+            self.write_output('\n')
+        if query_cursor:
+            self._update_cursor_position()
+            self._output_position = (self.row, self.column)
+        self._front.fill(UNKNOWN)
+        self._back.fill(UNKNOWN)
+        self._dirty_rows.clear()
+
+    def _line_feed(self, count=1):
+        # The terminal scrolls at the bottom, the cursor stays on the last row.
+        row = self.row + count
+        if row > self.screen_height:
+            self._scrolled += row - self.screen_height
+            row = self.screen_height
+        self.row = row
+
+    def _advance(self, width):
+        if width == 0:
+            return
+        # A column past the right edge means the terminal wraps on the next char.
+        end = self.column - 1 + width
+        wraps = (end - 1) // self.screen_width
+        self._line_feed(wraps)
+        self.column = end - wraps * self.screen_width + 1
+
+    def _follow_output(self, text):
+        for part in _MOVEMENT.split(_INVISIBLE.sub('', text)):
+            match part:
+                case '\n':
+                    # The tty's output processing turns newlines into CR LF.
+                    self._line_feed()
+                    self.column = 1
+                case '\r':
+                    self.column = 1
+                case '\t':
+                    self.column = min((self.column - 1) // 8 * 8 + 9,
+                                      self.screen_width)
+                case '\b':
+                    self.column = max(min(self.column, self.screen_width) - 1, 1)
+                case _:
+                    self._advance(_text_width(part))
+
+    def write_output(self, text):
+        """Write text straight to the terminal, the way a program's output is
+
+        The cursor is followed through the text, including wrapping and scrolling,
+        so where the output leaves it is known without asking the terminal. What
+        was drawn scrolls with it, and the rows the output went over are unknown.
+        """
+        self.flush()
+        self._frame.write(text.encode(self._encoding) if self._binary else text)
+        self._send_frame()
+
+        start_row = self.row
+        self._scrolled = 0
+        self._follow_output(text)
+        if self._scrolled:
+            self._front.scroll_up(self._scrolled)
+            self._back.scroll_up(self._scrolled)
+            start_row = max(start_row - self._scrolled, 1)
+        for row in range(start_row - 1, self.row):
+            self._front.fill_row(row, UNKNOWN)
+            self._back.fill_row(row, UNKNOWN)
+        self._output_position = (self.row, self.column)
 
     def move_cursor_left(self, amount=1):
         assert amount > 0
         assert amount <= self.column
-        self._ostream.write(escape_codes.move_cursor_left(amount))
         self.column -= amount
 
     def move_cursor_right(self, amount=1):
         assert amount > 0
-        self._ostream.write(
-            escape_codes.move_cursor_right(amount, self._ostream))
         self.column += amount
 
     def move_cursor_up(self, amount=1):
         assert amount > 0
         assert amount <= self.row
-        self._ostream.write(escape_codes.move_cursor_up(amount, self._ostream))
         self.row -= amount
 
     def move_cursor_down(self, amount=1):
         assert amount > 0
-        self._ostream.write(
-            escape_codes.move_cursor_down(amount, self._ostream))
         self.row += amount
 
     def move_to_column(self, column):
         assert column >= 0
-        self._ostream.write(escape_codes.move_cursor_to_column(column))
+        self.column = column
 
     def erase_line(self):
-        self._ostream.write(escape_codes.erase_line())
+        """Erase the current row from the cursor, what is left of it is kept"""
+        self._back.fill_row(self.row - 1, BLANK, self.column - 1)
+        self._dirty_rows.add(self.row - 1)
 
     def move_cursor_to(self, row=None, column=None):
         if row is not None:
             self.row = row
         if column is not None:
             self.column = column
-        self._ostream.write(escape_codes.move_cursor_to(self.row, self.column))
 
     def __str__(self):
-        return ''.join([''.join(line) for line in self._lines])
+        return ''.join(
+            [self._back.text(row) for row in range(self.screen_height)])
+
+
+class TermWriter(io.TextIOBase):
+    """A text stream that writes to a Term as program output, for sys.stdout
+
+    Like a terminal's stdout it's line buffered.
+    """
+
+    def __init__(self, term):
+        self._term = term
+        self._pending = []
+
+    @property
+    def encoding(self):
+        return self._term._encoding
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._pending.append(text)
+        if '\n' in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._pending:
+            text = ''.join(self._pending)
+            self._pending.clear()
+            self._term.write_output(text)
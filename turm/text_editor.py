@@ -1,8 +1,17 @@
+from turm.gap_buffer import GapBuffer
+from turm.line_index import LineIndex
+
+
 class TextEditor:
 
-    def __init__(self):
-        self._text = []
+    def __init__(self, buffer_type=GapBuffer):
+        # `buffer_type` can be `list` to use the plain list implementation, which
+        # is simpler but makes edits in the middle of large inputs O(n).
+        self._text = buffer_type()
+        self._lines = LineIndex()
         self._cursor = 0
+        # The rows changed since the last call to `take_damage`.
+        self._damage = None
 
     def _get_line(self):
         start = self._cursor
@@ -22,67 +31,97 @@ class TextEditor:
     def iter_lines(self):
 
         def lines_iter():
-            start = 0
-            end = self._end_of_line_index(start)
-            yield ''.join(self._text[start:end + 1])
-            while end != len(self._text):
-                start = end + 1
-                end = self._end_of_line_index(start)
-                yield ''.join(self._text[start:end + 1])
+            for row in range(self._lines.line_count()):
+                yield self.get_line(row)
 
         return lines_iter()
 
     def get_line(self, row=None):
-        start = 0
-        end = self._end_of_line_index(start)
-        for _ in range(row):
-            start = end + 1
-            end = self._end_of_line_index(start)
+        start = self._lines.line_start(row)
+        end = self._lines.line_end(row)
         return ''.join(self._text[start:end + 1])
 
+    def line_count(self):
+        return self._lines.line_count()
+
+    def line_offsets(self):
+        """The index in the text that each line starts at"""
+        return self._lines.line_offsets()
+
+    def _add_damage(self, index, text):
+        """Record the rows changed by inserting or removing `text` at `index`
+
+        Adding or removing a newline moves every following row, which is recorded
+        with an end row of None.
+        """
+        first = self._lines.row_of(index)
+        last = None if '\n' in text else first
+        if self._damage is not None:
+            first = min(first, self._damage[0])
+            if last is not None and self._damage[1] is not None:
+                last = max(last, self._damage[1])
+            else:
+                last = None
+        self._damage = (first, last)
+
+    def take_damage(self):
+        """Return the (first, last) rows changed since the last call, or None"""
+        damage = self._damage
+        self._damage = None
+        return damage
+
     def insert(self, char):
         self._text.insert(self._cursor, char)
+        self._lines.insert(self._cursor, char)
+        self._add_damage(self._cursor, char)
         self._cursor += 1
 
-    def _rindex(self, value, start=None, stop=-1):
-        if start is None:
-            start = len(self._text) - 1
-
-        for i in range(start, stop, -1):
-            if self._text[i] == value:
-                return i
-
-        raise ValueError(f"'{value}' is not in text")
+    def insert_text(self, text):
+        self._text[self._cursor:self._cursor] = text
+        self._lines.insert(self._cursor, text)
+        self._add_damage(self._cursor, text)
+        self._cursor += len(text)
+
+    def delete_range(self, start, end):
+        """Delete the text from `start` up to `end` and return it"""
+        start = max(start, 0)
+        end = min(end, len(self._text))
+        if start >= end:
+            return ''
+
+        text = ''.join(self._text[start:end])
+        self._add_damage(start, text)
+        del self._text[start:end]
+        self._lines.delete(start, end)
+
+        if self._cursor >= end:
+            self._cursor -= end - start
+        elif self._cursor > start:
+            self._cursor = start
+        return text
+
+    def clear(self):
+        """Remove all of the text, keeping the allocated buffers for reuse"""
+        self.delete_range(0, len(self._text))
+        self._damage = None
 
     def _start_of_line_index(self, index):
-        try:
-            # `index` could be on the end of a line (i.e. the '\n' character) so we need
-            # to start the search from `index - 1`. The result index is the end of the
-            # previous line so we add 1 back to get the start of the line.
-            return self._rindex('\n', start=index - 1) + 1
-        except ValueError:
-            return 0
+        return self._lines.line_start(self._lines.row_of(index))
 
     def _end_of_line_index(self, index):
-        try:
-            return self._text.index('\n', index)
-        except ValueError:
-            return len(self._text)
+        return self._lines.line_end(self._lines.row_of(index))
 
     def _is_eol(self, index):
         return index == len(self._text) or self._text[self._cursor] == '\n'
 
     def get_row_and_column(self):
-        current_line_start = self._start_of_line_index(self._cursor)
-        column = self._cursor - current_line_start
-
-        row = 0
-        x = current_line_start
-        while x > 0:
-            row += 1
-            x = self._start_of_line_index(x - 1)
+        row = self._lines.row_of(self._cursor)
+        column = self._cursor - self._lines.line_start(row)
         return (row, column)
 
+    def get_cursor_index(self):
+        return self._cursor
+
     def get_column(self):
         return self.get_row_and_column()[1]
 
@@ -131,9 +170,15 @@ class TextEditor:
 
     def pop(self):
         try:
-            return self._text.pop(self._cursor)
+            char = self._text.pop(self._cursor)
         except IndexError:
-            pass
+            return None
+        self._add_damage(self._cursor, char)
+        self._lines.delete(self._cursor, self._cursor + 1)
+        return char
+
+    def __len__(self):
+        return len(self._text)
 
     def __str__(self):
         return ''.join(self._text)